@@ -0,0 +1,214 @@
+"""Архив партий: двоичный файл с дозаписью и отдельный индекс смещений.
+
+Формат данных (все числа little-endian):
+    заголовок файла:  b'CHSA' + версия (uint16)
+    запись партии:    время (uint32, секунды от эпохи), число полуходов (uint16),
+                      длина статуса (uint32), ходы по 2 байта, статус в UTF-8
+Ход кодируется в uint16: биты 0-5 - откуда, 6-11 - куда, 12-14 - превращение.
+Индекс (файл с суффиксом .idx): на каждую партию смещение записи (uint64) и её длина (uint32).
+
+Чтение идёт через mmap без копирования данных, партии только дописываются в конец.
+Методы insert_game_record и get_moves совместимы с GameDatabase.
+Перенос существующей базы: python archive.py chess_games.db chess_games.archive
+"""
+import argparse
+import datetime
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+
+from position import PROMOTIONS, move_name, parse_move
+
+MAGIC = b'CHSA'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')
+RECORD_HEADER = struct.Struct('<IHI')  # Время, число полуходов, длина статуса
+INDEX_ENTRY = struct.Struct('<QI')  # Смещение записи, длина записи
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+PROMOTION_CODES = {None: 0, **{kind: code for code, kind in enumerate(PROMOTIONS, 1)}}
+PROMOTION_KINDS = {code: kind for kind, code in PROMOTION_CODES.items()}
+
+
+def encode_move(text):
+    """Ход 'e2e4' -> число uint16."""
+    frm, to, promotion = parse_move(text)
+    return frm | to << 6 | PROMOTION_CODES[promotion] << 12
+
+
+def decode_move(code):
+    """Число uint16 -> ход 'e2e4'."""
+    return move_name((code & 63, code >> 6 & 63, PROMOTION_KINDS[code >> 12]))
+
+
+class GameArchive:
+    """Архив партий с интерфейсом, как у GameDatabase."""
+
+    def __init__(self, path='chess_games.archive'):
+        self.path = path
+        self.index_path = path + '.idx'
+        new = not os.path.exists(path)
+        self.data_file = open(path, 'ab')
+        self.index_file = open(self.index_path, 'ab')
+        if new:
+            self.data_file.write(FILE_HEADER.pack(MAGIC, VERSION))
+            self.data_file.flush()
+        self.data_map = None  # Отображения файлов в память, пересоздаются при росте файлов
+        self.index_map = None
+        self._remap()
+        magic, version = FILE_HEADER.unpack_from(self.data_map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: неизвестный формат архива")
+
+    def _remap(self):
+        """Отображает файлы в память заново, чтобы стали видны дописанные партии."""
+        self._unmap()
+        self.data_map = self._map(self.path)
+        self.index_map = self._map(self.index_path)
+
+    def _unmap(self):
+        for mapped in (self.data_map, self.index_map):
+            if isinstance(mapped, mmap.mmap):
+                try:
+                    mapped.close()
+                except BufferError:
+                    pass  # Выданные move_codes представления ещё живы - закроется сборщиком мусора
+
+    @staticmethod
+    def _map(path):
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b''  # Пустой файл нельзя отобразить в память
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.index_map) // INDEX_ENTRY.size
+
+    def insert_game_record(self, game_status, moves='', game_date=None, flush=True):
+        """Дописывает партию в конец архива.
+
+        Args:
+            game_status (str): Текст статуса партии, как в GameDatabase.
+            moves (str | list): Ходы в координатной записи, строкой через пробел или списком.
+            game_date (datetime.datetime): Дата партии (по умолчанию - текущая).
+            flush (bool): Сбросить файлы на диск (при пакетной записи - только в конце).
+
+        Returns:
+            int: Номер партии (начиная с 1) или None, если партия не записана.
+        """
+        if not game_status:
+            return None  # Как и GameDatabase, партии с пустым статусом не записываем
+        if isinstance(moves, str):
+            moves = moves.split()
+        game_date = game_date or datetime.datetime.now()
+        status = game_status.encode('utf-8')
+        record = (RECORD_HEADER.pack(int(game_date.timestamp()), len(moves), len(status))
+                  + struct.pack(f'<{len(moves)}H', *(encode_move(move) for move in moves))
+                  + status)
+        offset = self.data_file.tell()
+        self.data_file.write(record)
+        # Индекс пишется после данных: при сбое останется лишь недоступный хвост данных
+        self.index_file.write(INDEX_ENTRY.pack(offset, len(record)))
+        if flush:
+            self.flush()
+        return self.index_file.tell() // INDEX_ENTRY.size
+
+    def flush(self):
+        self.data_file.flush()
+        self.index_file.flush()
+        self._remap()
+
+    def _record(self, game_id):
+        if not 1 <= game_id <= len(self):
+            raise IndexError(f"партия {game_id} не найдена")
+        offset, length = INDEX_ENTRY.unpack_from(self.index_map, (game_id - 1) * INDEX_ENTRY.size)
+        return memoryview(self.data_map)[offset:offset + length]
+
+    def move_codes(self, game_id):
+        """Ходы партии кодами uint16 - представление поверх mmap без копирования."""
+        record = self._record(game_id)
+        _, plies, _ = RECORD_HEADER.unpack_from(record)
+        codes = record[RECORD_HEADER.size:RECORD_HEADER.size + plies * 2]
+        if sys.byteorder == 'little':
+            return codes.cast('H')
+        return struct.unpack(f'<{plies}H', codes)
+
+    def get_moves(self, game_id):
+        """Ходы партии списком в координатной записи (пустой, если партии нет)."""
+        if not 1 <= game_id <= len(self):
+            return []
+        return [decode_move(code) for code in self.move_codes(game_id)]
+
+    def get_game(self, game_id):
+        """Партия кортежем (id, дата, статус, ходы), как строка таблицы games."""
+        record = self._record(game_id)
+        timestamp, plies, status_length = RECORD_HEADER.unpack_from(record)
+        start = RECORD_HEADER.size + plies * 2
+        status = bytes(record[start:start + status_length]).decode('utf-8')
+        game_date = datetime.datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
+        return game_id, game_date, status, self.get_moves(game_id)
+
+    def scan(self):
+        """Последовательно перебирает партии: (id, коды ходов)."""
+        for game_id in range(1, len(self) + 1):
+            yield game_id, self.move_codes(game_id)
+
+    def close(self):
+        self.data_file.close()
+        self.index_file.close()
+        self._unmap()
+
+
+def convert(db_path='chess_games.db', archive_path='chess_games.archive'):
+    """Переносит партии из SQLite-базы GameDatabase в новый архив. Возвращает число партий.
+
+    Архив сначала пишется во временные файлы и переименовывается только после
+    успешного переноса, поэтому при ошибке на середине архив не появляется.
+    Номера партий в архиве идут подряд и могут не совпадать с id в базе.
+
+    Raises:
+        FileExistsError: В архиве уже есть партии (повторный перенос задублировал бы их).
+    """
+    index_path = archive_path + '.idx'
+    if os.path.exists(index_path) and os.path.getsize(index_path):
+        raise FileExistsError(f"{archive_path}: архив не пуст")
+    temp_path = archive_path + '.tmp'
+    for path in (temp_path, temp_path + '.idx'):
+        if os.path.exists(path):
+            os.remove(path)  # Остатки прерванного переноса
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(games)")]
+    moves_column = 'moves' if 'moves' in columns else "''"  # В старых базах ходы не сохранялись
+    cursor.execute(f"SELECT game_date, game_status, {moves_column} FROM games ORDER BY id")
+    archive = GameArchive(temp_path)
+    count = 0
+    try:
+        for game_date, game_status, moves in cursor:
+            if archive.insert_game_record(game_status, moves or '',
+                                          datetime.datetime.strptime(game_date, DATE_FORMAT), flush=False):
+                count += 1
+        archive.flush()
+    except Exception:
+        archive.close()
+        os.remove(temp_path)
+        os.remove(temp_path + '.idx')
+        raise
+    finally:
+        conn.close()
+    archive.close()
+    # Сначала данные, потом индекс: до замены индекса архив остаётся пустым, а не битым
+    os.replace(temp_path, archive_path)
+    os.replace(temp_path + '.idx', index_path)
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Перенос партий из SQLite в архив')
+    parser.add_argument('db', nargs='?', default='chess_games.db')
+    parser.add_argument('archive', nargs='?', default='chess_games.archive')
+    args = parser.parse_args()
+    print(f"Перенесено партий: {convert(args.db, args.archive)}")
@@ -0,0 +1,346 @@
+"""Пакетная генерация ходов на NumPy для тысяч позиций за один вызов.
+
+Позиции задаются плоскостями расстановки: массив (N, 12, 8, 8) из bool,
+плоскость p = PLANES.index((цвет, фигура)), индексы [n, p, y, x] - как в main.py.
+Внутри каждая плоскость превращается в 64-битную маску (бит sq = y * 8 + x),
+и все операции выполняются сразу над всеми N позициями.
+
+Результат move_masks - массив (N, 64) из uint64: для каждой клетки-источника
+маска клеток, куда фигура с неё может легально пойти (превращения не различаются).
+"""
+import random
+import time
+
+import numpy as np
+
+from position import (Position, WHITE, BLACK, KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN,
+                      PAWN_ATTACKS, KNIGHT_TARGETS, KING_TARGETS, square)
+
+KINDS = (KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN)
+PLANES = tuple((color, kind) for color in (WHITE, BLACK) for kind in KINDS)
+
+_ONE = np.uint64(1)
+_ZERO = np.uint64(0)
+_ALL = np.uint64(0xFFFFFFFFFFFFFFFF)
+_BITS = np.array([1 << sq for sq in range(64)], dtype=np.uint64)
+_NO_SQUARE = 64  # Индекс-заглушка: "клетки нет"
+
+FILE_A = np.uint64(0x0101010101010101)
+FILE_H = np.uint64(0x8080808080808080)
+FILE_AB = np.uint64(0x0303030303030303)
+FILE_GH = np.uint64(0xC0C0C0C0C0C0C0C0)
+RANK_2 = np.uint64(0x000000000000FF00)
+RANK_7 = np.uint64(0x00FF000000000000)
+
+ORTHOGONAL_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL_DIRECTIONS = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+DIRECTIONS = ORTHOGONAL_DIRECTIONS + DIAGONAL_DIRECTIONS
+
+
+def _mask(squares):
+    result = 0
+    for sq in squares:
+        result |= 1 << sq
+    return result
+
+
+def _table(targets):
+    return np.array([_mask(squares) for squares in targets], dtype=np.uint64)
+
+
+def _ray_table(dx, dy):
+    """Лучи из каждой клетки в направлении (dx, dy); элемент 64 - пустой луч."""
+    rays = []
+    for sq in range(64):
+        x, y = sq % 8 + dx, sq // 8 + dy
+        ray = 0
+        while 0 <= x < 8 and 0 <= y < 8:
+            ray |= 1 << square(x, y)
+            x += dx
+            y += dy
+        rays.append(ray)
+    rays.append(0)
+    return np.array(rays, dtype=np.uint64)
+
+
+KNIGHT_MASKS = _table(KNIGHT_TARGETS)
+KING_MASKS = _table(KING_TARGETS)
+PAWN_ATTACK_MASKS = {color: _table(targets) for color, targets in PAWN_ATTACKS.items()}
+RAYS = {direction: _ray_table(*direction) for direction in DIRECTIONS}
+# Направления, в которых индекс клетки растёт: ближайшая фигура - младший бит
+_ASCENDING = {direction: direction[1] > 0 or (direction[1] == 0 and direction[0] > 0)
+              for direction in DIRECTIONS}
+
+# Клетки строго между двумя клетками одной линии, иначе 0; строка 64 - пустая
+BETWEEN = np.zeros((65, 65), dtype=np.uint64)
+for _sq in range(64):
+    for _direction in DIRECTIONS:
+        _ray = int(RAYS[_direction][_sq])
+        for _target in range(64):
+            if _ray >> _target & 1:
+                BETWEEN[_sq, _target] = np.uint64(_ray ^ int(RAYS[_direction][_target]) ^ (1 << _target))
+
+
+def _lsb_index(bb):
+    """Индекс младшего установленного бита, 64 для пустой маски."""
+    lowest = bb & (~bb + _ONE)
+    with np.errstate(divide='ignore'):
+        index = np.log2(lowest.astype(np.float64))  # Степень двойки представима точно
+    return np.where(bb == _ZERO, _NO_SQUARE, index).astype(np.int64)
+
+
+def _msb_index(bb):
+    """Индекс старшего установленного бита, 64 для пустой маски."""
+    with np.errstate(divide='ignore'):
+        index = np.floor(np.log2(bb.astype(np.float64)))
+    index = np.where(bb == _ZERO, 0, index).astype(np.int64)
+    # Перевод в float64 может округлить число вверх до следующей степени двойки
+    index -= (np.left_shift(_ONE, index.astype(np.uint64)) > bb).astype(np.int64)
+    return np.where(bb == _ZERO, _NO_SQUARE, index)
+
+
+def _nearest(bb, direction):
+    return _lsb_index(bb) if _ASCENDING[direction] else _msb_index(bb)
+
+
+def _ray_attacks(sq, occupied, direction):
+    """Атака дальнобойной фигуры с клетки sq (число или массив) в одном направлении."""
+    ray = RAYS[direction][sq]
+    first = _nearest(ray & occupied, direction)
+    return ray ^ RAYS[direction][first]
+
+
+def _shift(bb, dx, dy):
+    """Сдвиг масок на (dx, dy) без переноса через край доски."""
+    if dx == 1:
+        bb = bb & ~FILE_H
+    elif dx == -1:
+        bb = bb & ~FILE_A
+    elif dx == 2:
+        bb = bb & ~FILE_GH
+    elif dx == -2:
+        bb = bb & ~FILE_AB
+    delta = dx + 8 * dy
+    if delta > 0:
+        return np.left_shift(bb, np.uint64(delta))
+    return np.right_shift(bb, np.uint64(-delta))
+
+
+def _slide(pieces, empty, dx, dy):
+    """Атаки дальнобойных фигур в одном направлении (заполнение с препятствиями)."""
+    flood = pieces
+    for _ in range(6):
+        pieces = _shift(pieces, dx, dy) & empty
+        flood = flood | pieces
+    return _shift(flood, dx, dy)
+
+
+def _attacks(pieces, pawn_dy, occupied):
+    """Все клетки, которые бьют фигуры одной стороны.
+
+    Args:
+        pieces (dict): Маски фигур стороны по кодам.
+        pawn_dy (np.ndarray): Направление хода пешек стороны (+1 или -1) для каждой позиции.
+        occupied (np.ndarray): Занятые клетки.
+    """
+    empty = ~occupied
+    result = np.zeros_like(occupied)
+    for dx, dy in ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)):
+        result |= _shift(pieces[KNIGHT], dx, dy)
+    for dx, dy in ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+        result |= _shift(pieces[KING], dx, dy)
+    pawns = pieces[PAWN]
+    up = _shift(pawns, -1, 1) | _shift(pawns, 1, 1)
+    down = _shift(pawns, -1, -1) | _shift(pawns, 1, -1)
+    result |= np.where(pawn_dy > 0, up, down)
+    for directions, kind in ((ORTHOGONAL_DIRECTIONS, ROOK), (DIAGONAL_DIRECTIONS, BISHOP)):
+        sliders = pieces[kind] | pieces[QUEEN]
+        for dx, dy in directions:
+            result |= _slide(sliders, empty, dx, dy)
+    return result
+
+
+def bitboards(planes):
+    """Плоскости (N, 12, 8, 8) -> маски (N, 12) uint64."""
+    planes = np.asarray(planes, dtype=bool).reshape(len(planes), 12, 64)
+    return np.bitwise_or.reduce(np.where(planes, _BITS, _ZERO), axis=2)
+
+
+def _sides(boards):
+    return ({kind: boards[:, index] for index, kind in enumerate(KINDS)},
+            {kind: boards[:, index + 6] for index, kind in enumerate(KINDS)})
+
+
+def attack_sets(planes):
+    """Клетки под боем каждой стороны.
+
+    Returns:
+        np.ndarray: (N, 2) uint64 - атаки белых и атаки чёрных.
+    """
+    boards = bitboards(planes)
+    white, black = _sides(boards)
+    occupied = np.bitwise_or.reduce(boards, axis=1)
+    n = len(boards)
+    return np.stack([_attacks(white, np.ones(n), occupied),
+                     _attacks(black, -np.ones(n), occupied)], axis=1)
+
+
+def move_masks(planes, white_to_move):
+    """Легальные ходы для N позиций.
+
+    Args:
+        planes (np.ndarray): Плоскости расстановки (N, 12, 8, 8).
+        white_to_move (np.ndarray): (N,) bool - ходят ли белые.
+
+    Returns:
+        np.ndarray: (N, 64) uint64, [n, sq] - куда может пойти фигура с клетки sq.
+    """
+    boards = bitboards(planes)
+    white_to_move = np.asarray(white_to_move, dtype=bool)
+    n = len(boards)
+    white, black = _sides(boards)
+    us = {kind: np.where(white_to_move, white[kind], black[kind]) for kind in KINDS}
+    them = {kind: np.where(white_to_move, black[kind], white[kind]) for kind in KINDS}
+    own = np.bitwise_or.reduce(np.stack(list(us.values())), axis=0)
+    enemy = np.bitwise_or.reduce(np.stack(list(them.values())), axis=0)
+    occupied = own | enemy
+    empty = ~occupied
+    pawn_dy = np.where(white_to_move, 1, -1)
+
+    # Клетки под боем противника; король убран с доски, чтобы он не мог отступить вдоль линии шаха
+    danger = _attacks(them, -pawn_dy, occupied & ~us[KING])
+
+    # Шахующие фигуры и допустимые клетки для остальных фигур при шахе
+    king_sq = _lsb_index(us[KING])
+    pawn_attacks = np.where(white_to_move, PAWN_ATTACK_MASKS[WHITE][np.minimum(king_sq, 63)],
+                            PAWN_ATTACK_MASKS[BLACK][np.minimum(king_sq, 63)])
+    checkers = (KNIGHT_MASKS[np.minimum(king_sq, 63)] & them[KNIGHT]) | (pawn_attacks & them[PAWN])
+    for direction in DIRECTIONS:
+        kind = ROOK if direction in ORTHOGONAL_DIRECTIONS else BISHOP
+        checkers |= _ray_attacks(king_sq, occupied, direction) & (them[kind] | them[QUEEN])
+    checkers = np.where(king_sq == _NO_SQUARE, _ZERO, checkers)
+    single_check = (checkers & (checkers - _ONE)) == _ZERO
+    evasion = np.where(checkers == _ZERO, _ALL,
+                       np.where(single_check, checkers | BETWEEN[king_sq, _lsb_index(checkers)], _ZERO))
+
+    # Связанные фигуры могут ходить только по линии связки
+    restrict = np.broadcast_to(evasion[:, None], (n, 64)).copy()
+    rows = np.arange(n)
+    for direction in DIRECTIONS:
+        kind = ROOK if direction in ORTHOGONAL_DIRECTIONS else BISHOP
+        ray = RAYS[direction][king_sq]
+        blockers = ray & occupied
+        first = _nearest(blockers, direction)
+        second = _nearest(blockers & RAYS[direction][first], direction)
+        pinned = ((first < _NO_SQUARE) & ((own >> np.minimum(first, 63).astype(np.uint64)) & _ONE == _ONE)
+                  & (second < _NO_SQUARE)
+                  & (((them[kind] | them[QUEEN]) >> np.minimum(second, 63).astype(np.uint64)) & _ONE == _ONE))
+        line = ray ^ RAYS[direction][second]
+        restrict[rows[pinned], first[pinned]] &= line[pinned]
+
+    masks = np.zeros((n, 64), dtype=np.uint64)
+    for sq in range(64):
+        bit = _BITS[sq]
+        # Считаем только позиции, где на клетке стоит своя фигура
+        rows = np.flatnonzero(own & bit)
+        if not len(rows):
+            continue
+        occ, free, mine, theirs = occupied[rows], empty[rows], own[rows], enemy[rows]
+        white_rows = white_to_move[rows]
+        moves = np.where(us[KNIGHT][rows] & bit, KNIGHT_MASKS[sq], _ZERO)
+        for directions, kind in ((ORTHOGONAL_DIRECTIONS, ROOK), (DIAGONAL_DIRECTIONS, BISHOP)):
+            sliders = np.flatnonzero((us[kind][rows] | us[QUEEN][rows]) & bit)
+            if len(sliders):
+                for direction in directions:
+                    moves[sliders] |= _ray_attacks(sq, occ[sliders], direction)
+
+        # Пешки: ход вперёд, два поля с начальной горизонтали, взятия по диагонали
+        pawns = np.flatnonzero(us[PAWN][rows] & bit)
+        if len(pawns):
+            up = white_rows[pawns]
+            forward = np.where(up, _shift(bit, 0, 1), _shift(bit, 0, -1)) & free[pawns]
+            double = np.where(up, _shift(forward, 0, 1) & RANK_2 << np.uint64(16),
+                              _shift(forward, 0, -1) & RANK_7 >> np.uint64(16)) & free[pawns]
+            captures = np.where(up, PAWN_ATTACK_MASKS[WHITE][sq], PAWN_ATTACK_MASKS[BLACK][sq]) & theirs[pawns]
+            moves[pawns] |= forward | double | captures
+
+        moves = moves & ~mine & restrict[rows, sq]
+        moves |= np.where(us[KING][rows] & bit, KING_MASKS[sq] & ~mine & ~danger[rows], _ZERO)
+        masks[rows, sq] = moves
+    return masks
+
+
+def planes_from_positions(positions):
+    """Переводит список Position в плоскости и массив очереди хода."""
+    planes = np.zeros((len(positions), 12, 8, 8), dtype=bool)
+    for n, position in enumerate(positions):
+        for sq, piece in position.pieces():
+            planes[n, PLANES.index(piece), sq // 8, sq % 8] = True
+    white_to_move = np.array([position.side == WHITE for position in positions])
+    return planes, white_to_move
+
+
+def scalar_masks(position):
+    """Те же маски, построенные обычным генератором Position.legal_moves."""
+    masks = np.zeros(64, dtype=np.uint64)
+    for frm, to, _ in position.legal_moves():
+        masks[frm] |= _BITS[to]
+    return masks
+
+
+def random_positions(count, max_plies=80, seed=0):
+    """Позиции из случайных партий от начальной расстановки."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = Position.initial()
+        for _ in range(rng.randrange(max_plies)):
+            moves = position.legal_moves()
+            if not moves or position.kings[BLACK] is None or position.kings[WHITE] is None:
+                break
+            position.make_move(rng.choice(moves))
+        positions.append(position.copy())
+    return positions
+
+
+def verify(positions):
+    """Сравнивает пакетный генератор с обычным.
+
+    Returns:
+        list: Индексы позиций, в которых маски разошлись.
+    """
+    planes, white_to_move = planes_from_positions(positions)
+    batch = move_masks(planes, white_to_move)
+    return [n for n, position in enumerate(positions)
+            if not np.array_equal(batch[n], scalar_masks(position))]
+
+
+def benchmark(batch_sizes=(1, 10, 100, 1000, 10000, 100000), pool_size=1000):
+    """Позиций в секунду для пакетного и обычного генераторов.
+
+    Для больших пакетов позиции из пула повторяются - на скорость это не влияет.
+
+    Returns:
+        dict: {размер пакета: (пакетный, обычный)}, позиций/с.
+    """
+    pool = random_positions(pool_size)
+    pool_planes, pool_sides = planes_from_positions(pool)
+    results = {}
+    started = time.perf_counter()
+    for position in pool:
+        scalar_masks(position)
+    scalar_rate = len(pool) / (time.perf_counter() - started)
+    for size in batch_sizes:
+        index = np.arange(size) % len(pool)
+        planes, sides = pool_planes[index], pool_sides[index]
+        started = time.perf_counter()
+        move_masks(planes, sides)
+        results[size] = (size / (time.perf_counter() - started), scalar_rate)
+    return results
+
+
+if __name__ == '__main__':
+    sample = random_positions(500, seed=1)
+    print(f"Расхождений с обычным генератором: {len(verify(sample))} из {len(sample)}")
+    for size, (batch_rate, scalar_rate) in benchmark().items():
+        print(f"пакет {size:>6}: {batch_rate:>12,.0f} позиций/с (обычный генератор {scalar_rate:,.0f})")
@@ -0,0 +1,105 @@
+"""Нагрузочный клиент для server.py: много открытых партий, случайные ходы.
+
+Открывает указанное число партий, распределяет их по соединениям и по кругу делает
+в них случайные допустимые ходы. Печатает ходов в секунду и задержки (p50, p99).
+Запуск: python loadtest.py [--games 10000] [--connections 100] [--seconds 30]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+
+class Connection:
+    """Соединение с сервером; запросы отправляются по одному."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port, unix):
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, **request):
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    def close(self):
+        self.writer.close()
+
+
+async def player(connection, games, deadline, latencies, rng):
+    """Ходит по кругу во всех своих партиях до истечения времени."""
+    while time.perf_counter() < deadline:
+        for game in list(games):
+            if time.perf_counter() >= deadline:
+                break
+            moves = (await connection.request(action='legal_moves', game=game))['moves']
+            if not moves:
+                # Партия закончилась - заменяем её новой, чтобы число открытых партий не менялось
+                await connection.request(action='close', game=game)
+                games.remove(game)
+                games.append((await connection.request(action='new'))['game'])
+                continue
+            started = time.perf_counter()
+            response = await connection.request(action='move', game=game, move=rng.choice(moves))
+            latencies.append(time.perf_counter() - started)
+            if not response['ok']:
+                raise RuntimeError(response['error'])
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def run(games, connections, seconds, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, seed=0):
+    """Открывает партии и гоняет нагрузку.
+
+    Returns:
+        dict: ходов/с, p50 и p99 задержки хода в миллисекундах, число ходов.
+    """
+    rng = random.Random(seed)
+    pool = [await Connection.open(host, port, unix) for _ in range(connections)]
+    assigned = [[] for _ in pool]
+    for index in range(games):
+        connection = pool[index % connections]
+        assigned[index % connections].append((await connection.request(action='new'))['game'])
+
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(player(connection, own, deadline, latencies, rng)
+                           for connection, own in zip(pool, assigned)))
+    elapsed = time.perf_counter() - started
+    for connection in pool:
+        connection.close()
+    return {
+        'moves': len(latencies),
+        'moves_per_second': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Нагрузочный тест сервера партий')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='путь к Unix-сокету вместо TCP')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=30)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.games, args.connections, args.seconds, args.host, args.port, args.unix))
+    print(f"Партий: {args.games}, ходов: {result['moves']}, {result['moves_per_second']:,.0f} ходов/с, "
+          f"p50 {result['p50_ms']:.2f} мс, p99 {result['p99_ms']:.2f} мс")
@@ -1,19 +1,31 @@
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QMessageBox, QInputDialog, QDialog, QTableWidget,
-                             QTableWidgetItem, QVBoxLayout, QTextEdit)
+                             QTableWidgetItem, QVBoxLayout, QHBoxLayout, QTextEdit, QWidget, QPushButton,
+                             QSlider, QLabel)
 from PyQt6.QtGui import QPainter, QColor, QPixmap, QPen
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QThread, pyqtSignal
 from PyQt6 import uic
 import sqlite3
 import datetime
+import threading
+import time
+
+from position import Position, WHITE, PIECE_KINDS, PIECE_NAMES, square, move_name, parse_move
+from search import Search, MATE, MAX_PLY
+from replay import GameReplay
+from opening_tree import OpeningTree
 
 
 class Piece:
+    pixmaps = {}  # Загруженные изображения фигур, общие для всех экземпляров
+
     def __init__(self, x, y, color, image_path):
         self.x = x
         self.y = y
         self.color = color
-        self.image = QPixmap(image_path)
+        if image_path not in Piece.pixmaps:
+            Piece.pixmaps[image_path] = QPixmap(image_path)
+        self.image = Piece.pixmaps[image_path]
 
     def draw(self, painter, square_size):
         """
@@ -192,6 +204,74 @@ class Pawn(Piece):
         return moves
 
 
+def draw_board(painter, square_size, figures, highlighted_squares=(), king_in_check=None):
+    """
+    Рисует доску с фигурами, подсветкой и координатами.
+
+    Args:
+        painter (QPainter): Объект для рисования.
+        square_size (int): Размер клетки доски.
+        figures (list): Фигуры на доске.
+        highlighted_squares (set): Клетки, обведённые красной рамкой.
+        king_in_check (tuple): Координаты короля под шахом или None.
+    """
+    # Рисуем доску
+    light_color = QColor(255, 252, 201)
+    dark_color = QColor(99, 136, 100)
+
+    for i in range(8):
+        for j in range(8):
+            color = light_color if (i + j) % 2 == 0 else dark_color
+            painter.fillRect(j * square_size, i * square_size, square_size, square_size, color)
+
+    # Рисуем фигуры
+    for figure in figures:
+        figure.draw(painter, square_size)
+
+    # Подсветка рамок возможных ходов
+    pen = QPen(QColor(255, 0, 0), 2)  # Красная рамка шириной 2 пикселя
+    painter.setPen(pen)
+    for x, y in highlighted_squares:
+        painter.drawRect(x * square_size, y * square_size, square_size, square_size)
+
+    # Подсветка короля, если он под шахом
+    if king_in_check:
+        pen = QPen(QColor(0, 0, 255), 2)  # Синяя рамка шириной 2 пикселя
+        painter.setPen(pen)
+        king_x, king_y = king_in_check
+        painter.drawRect(king_x * square_size, king_y * square_size, square_size, square_size)
+
+    # Рисуем координаты столбцов (a-h)
+    text_pen = QPen(QColor(0, 0, 0))  # Черный цвет для текста
+    painter.setPen(text_pen)
+    font = painter.font()
+    font.setPointSize(10)
+    font.setBold(True)
+    painter.setFont(font)
+    for col in range(8):
+        letter = chr(ord('a') + col)  # Преобразуем индекс в букву (a-h)
+        painter.drawText(col * square_size + square_size // 2 - 7, 15, letter)
+
+    # Рисуем координаты рядов (1-8)
+    for row in range(8):
+        painter.drawText(10, row * square_size + square_size // 2 + 5, str(8 - row))  # Инвертируем ряды
+
+
+def figures_from_position(position):
+    """Создает фигуры для отрисовки по позиции без Qt."""
+    return [globals()[PIECE_NAMES[kind]](sq % 8, sq // 8, color) for sq, (color, kind) in position.pieces()]
+
+
+def board_move_name(move):
+    """Ход для подписей в интерфейсе с нумерацией рядов, как на доске (8 - y), например 'e7-e5'.
+
+    move_name из position используется только для хранения партий.
+    """
+    frm, to, promotion = move
+    return (f"{chr(ord('a') + frm % 8)}{8 - frm // 8}-{chr(ord('a') + to % 8)}{8 - to // 8}"
+            f"{promotion.lower() if promotion else ''}")
+
+
 # Шахматная доска и логика игры
 class ChessBoard(QMainWindow):
     """Основной класс для шахмат."""
@@ -199,12 +279,13 @@ class ChessBoard(QMainWindow):
     def __init__(self):
         super().__init__()
         uic.loadUi('Chess.ui', self)
-        self.setFixedSize(QSize(920, 680))
+        self.setFixedSize(QSize(1150, 680))
         self.setWindowTitle('Шахматы')
 
         self.figures = []  # Список всех фигур на доске
         self.selected_figure = None  # Выбранная фигура
         self.current_player = 'white'  # Текущий игрок
+        self.moves = []  # Сделанные ходы в координатной записи ('e2e4') для просмотра партии
         self.create_pieces()  # Инициализация фигур на доске
         self.highlighted_squares = set()  # Множество подсвеченных клеток
         self.play_again.clicked.connect(self.play_again_clicked)
@@ -215,6 +296,12 @@ class ChessBoard(QMainWindow):
         # Инициализация базы данных
         self.db = GameDatabase()
 
+        # Фоновый анализ текущей позиции
+        self.analysis_worker = AnalysisWorker()
+        self.analysis_worker.info.connect(self.show_analysis)
+        self.analysis_worker.start()
+        self.analysis_btn.clicked.connect(self.update_analysis)
+
     def is_empty(self, x, y):
         for figure in self.figures:
             if figure.x == x and figure.y == y:
@@ -227,6 +314,40 @@ class ChessBoard(QMainWindow):
                 return piece
         return None
 
+    def update_analysis(self):
+        """Перезапускает анализ для текущей позиции или останавливает его."""
+        # Очищаем все элементы, начиная с второго
+        for i in range(1, self.AnalysisList.count()):
+            self.AnalysisList.takeItem(1)
+
+        if self.analysis_btn.isChecked() and not self.game_over:
+            self.analysis_worker.analyse(Position.from_figures(self.figures, self.current_player))
+        else:
+            self.analysis_worker.pause()
+
+    def show_analysis(self, generation, depth, score, nodes_per_second, pv):
+        """Выводит результат очередной итерации анализа."""
+        if generation != self.analysis_worker.generation:
+            return  # Результат для позиции, анализ которой уже прерван
+        if score >= MATE - MAX_PLY:
+            score_text = f"Мат в {(MATE - score + 1) // 2}"
+        elif score <= -MATE + MAX_PLY:
+            score_text = f"Мат в -{(MATE + score + 1) // 2}"
+        else:
+            score_text = f"{score / 100:+.2f}"
+
+        for i in range(1, self.AnalysisList.count()):
+            self.AnalysisList.takeItem(1)
+        self.AnalysisList.addItem(f"Глубина: {depth}")
+        self.AnalysisList.addItem(f"Оценка (белые): {score_text}")
+        self.AnalysisList.addItem(f"Узлов/с: {nodes_per_second}")
+        self.AnalysisList.addItem(f"Вариант: {pv}")
+
+    def closeEvent(self, event):
+        self.analysis_worker.shutdown()
+        self.analysis_worker.wait()
+        super().closeEvent(event)
+
     def show_status_window(self):
         """Открывает окно с информацией о прошлых играх."""
         status_window = StatusWindow(self.db)
@@ -236,7 +357,7 @@ class ChessBoard(QMainWindow):
         # Запись в бд
         if self.StatusList.count() > 1:  # Только если в StatusList есть записи
             game_status = "\n".join([self.StatusList.item(i).text() for i in range(self.StatusList.count())])
-            self.db.insert_game_record(game_status)
+            self.db.insert_game_record(game_status, ' '.join(self.moves))
 
         # Создаем диалоговое окно с вопросом
         reply = QMessageBox.question(
@@ -262,6 +383,7 @@ class ChessBoard(QMainWindow):
 
         # Сбросить текущего игрока
         self.current_player = 'white'  # Белые начинают
+        self.moves.clear()
 
         # Очистить выделение и подсветку возможных ходов
         self.selected_figure = None
@@ -279,6 +401,7 @@ class ChessBoard(QMainWindow):
 
         # Обновить доску
         self.update()
+        self.update_analysis()
 
     def create_pieces(self):
         piece_data = {
@@ -316,47 +439,7 @@ class ChessBoard(QMainWindow):
         painter = QPainter(self)
         size = self.size()
         square_size = min(size.width(), size.height()) // 8
-
-        # Рисуем доску
-        light_color = QColor(255, 252, 201)
-        dark_color = QColor(99, 136, 100)
-
-        for i in range(8):
-            for j in range(8):
-                color = light_color if (i + j) % 2 == 0 else dark_color
-                painter.fillRect(j * square_size, i * square_size, square_size, square_size, color)
-
-        # Рисуем фигуры
-        for figure in self.figures:
-            figure.draw(painter, square_size)
-
-        # Подсветка рамок возможных ходов
-        pen = QPen(QColor(255, 0, 0), 2)  # Красная рамка шириной 2 пикселя
-        painter.setPen(pen)
-        for x, y in self.highlighted_squares:
-            painter.drawRect(x * square_size, y * square_size, square_size, square_size)
-
-        # Подсветка короля, если он под шахом
-        if self.king_in_check:
-            pen = QPen(QColor(0, 0, 255), 2)  # Синяя рамка шириной 2 пикселя
-            painter.setPen(pen)
-            king_x, king_y = self.king_in_check
-            painter.drawRect(king_x * square_size, king_y * square_size, square_size, square_size)
-
-        # Рисуем координаты столбцов (a-h)
-        text_pen = QPen(QColor(0, 0, 0))  # Черный цвет для текста
-        painter.setPen(text_pen)
-        font = painter.font()
-        font.setPointSize(10)
-        font.setBold(True)
-        painter.setFont(font)
-        for col in range(8):
-            letter = chr(ord('a') + col)  # Преобразуем индекс в букву (a-h)
-            painter.drawText(col * square_size + square_size // 2 - 7, 15, letter)
-
-        # Рисуем координаты рядов (1-8)
-        for row in range(8):
-            painter.drawText(10, row * square_size + square_size // 2 + 5, str(8 - row))  # Инвертируем ряды
+        draw_board(painter, square_size, self.figures, self.highlighted_squares, self.king_in_check)
 
     def mousePressEvent(self, event):
         """Обработчик нажатия."""
@@ -402,6 +485,7 @@ class ChessBoard(QMainWindow):
                     self.update()
                     return
                 # Превращение пешки, если она дошла до конца поля
+                was_pawn = isinstance(self.selected_figure, Pawn)
                 if isinstance(self.selected_figure, Pawn):
                     self.selected_figure.has_moved = True
                     # Белая пешка на последней линии
@@ -446,6 +530,12 @@ class ChessBoard(QMainWindow):
                             self.figures.append(new_piece)  # Добавляем новую фигуру
                             self.selected_figure = new_piece  # Устанавливаем новую фигуру как выбранную
 
+                # Запоминаем ход для просмотра партии
+                promotion = None
+                if was_pawn and not isinstance(self.selected_figure, Pawn):
+                    promotion = PIECE_KINDS[self.selected_figure.__class__.__name__]
+                self.moves.append(move_name((square(original_x, original_y), square(col, row), promotion)))
+
                 # Если шах противнику, подсветить его короля
                 if self.is_in_check('black' if self.current_player == 'white' else 'white'):
                     QMessageBox.information(self, "Шах!", f"{self.current_player.capitalize()} угрожает королю шахом!")
@@ -457,6 +547,7 @@ class ChessBoard(QMainWindow):
                     QMessageBox.information(self, "Мат!", f"{self.current_player.capitalize()} победил!")
                     self.StatusList.addItem(f"{self.current_player.capitalize()} ставит мат!")
                     self.game_over = True  # Устанавливаем флаг окончания игры
+                    self.update_analysis()
                     return
 
                 # Смена игрока
@@ -464,6 +555,7 @@ class ChessBoard(QMainWindow):
                 self.selected_figure = None
                 self.highlighted_squares.clear()
                 self.update()
+                self.update_analysis()
             else:
                 self.selected_figure = None
                 self.highlighted_squares.clear()
@@ -540,6 +632,7 @@ class GameDatabase:
         self.conn = sqlite3.connect(self.db_name)
         self.cursor = self.conn.cursor()
         self.create_database()
+        self.tree = OpeningTree(self.conn)  # Статистика дебютов, пополняется при записи партий
 
     def create_database(self):
         """Создание таблицы для хранения истории партий, если она не существует."""
@@ -547,29 +640,144 @@ class GameDatabase:
         CREATE TABLE IF NOT EXISTS games (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             game_date TEXT,
-            game_status TEXT
+            game_status TEXT,
+            moves TEXT
         )
         """)
+        # Базы, созданные до появления просмотра партий, не имеют колонки с ходами
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(games)")]
+        if 'moves' not in columns:
+            self.cursor.execute("ALTER TABLE games ADD COLUMN moves TEXT")
         self.conn.commit()
 
-    def insert_game_record(self, game_status):
+    def insert_game_record(self, game_status, moves=''):
         """Запись информации."""
         if game_status:  # Записываем только если StatusList не пуст
             game_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.cursor.execute("INSERT INTO games (game_date, game_status) VALUES (?, ?)",
-                                (game_date, game_status))
-            self.conn.commit()
+            # Партия и статистика дерева дебютов записываются одной транзакцией:
+            # если ходы не удастся разобрать, откатится и запись партии
+            with self.conn:
+                self.cursor.execute("INSERT INTO games (game_date, game_status, moves) VALUES (?, ?, ?)",
+                                    (game_date, game_status, moves))
+                self.tree.add_game(moves.split(), game_date, commit=False)
+
+    def get_moves(self, game_id):
+        """Ходы партии списком в координатной записи (пустой, если ходы не сохранялись)."""
+        self.cursor.execute("SELECT moves FROM games WHERE id = ?", (game_id,))
+        row = self.cursor.fetchone()
+        return row[0].split() if row and row[0] else []
 
     def close(self):
         self.conn.close()
 
 
+class AnalysisWorker(QThread):
+    """Непрерывный анализ позиции в фоновом потоке.
+
+    Новая позиция прерывает текущий перебор и запускает его заново.
+    Сигнал info отправляется не чаще, чем раз в INTERVAL секунд, чтобы не перегружать
+    очередь событий интерфейса; во время долгой итерации он повторяет последний
+    законченный результат с текущей скоростью перебора.
+    """
+    info = pyqtSignal(int, int, int, int, str)  # Поколение, глубина, оценка за белых, узлов/с, вариант
+    INTERVAL = 0.25
+    TT_SIZE = 1 << 18  # Записей хеш-таблицы, около 50 МБ
+
+    def __init__(self):
+        super().__init__()
+        self.condition = threading.Condition()
+        self.next_position = None  # Позиция, ожидающая анализа
+        self.search = None  # Текущий перебор
+        self.running = True
+        # Номер запроса анализа: сигналы, уже стоящие в очереди интерфейса от прежней позиции,
+        # приходят со старым номером и отбрасываются в show_analysis
+        self.generation = 0
+        self.search_generation = 0  # Номер запроса, который считает текущий перебор
+        self.started_at = 0
+        self.last_emit = 0
+        self.search_nodes = 0
+        self.latest = None  # Последняя законченная итерация: (глубина, оценка, вариант)
+        self.pending = False  # Есть результат, ещё не отправленный из-за ограничения частоты
+
+    def analyse(self, position):
+        """Начинает анализ новой позиции, прерывая текущий."""
+        with self.condition:
+            self.generation += 1
+            self.next_position = position
+            if self.search:
+                self.search.stop()
+            self.condition.notify()
+
+    def pause(self):
+        """Останавливает анализ до следующего вызова analyse."""
+        with self.condition:
+            self.generation += 1
+            self.next_position = None
+            if self.search:
+                self.search.stop()
+
+    def shutdown(self):
+        with self.condition:
+            self.running = False
+            if self.search:
+                self.search.stop()
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and self.next_position is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                position = self.next_position
+                self.next_position = None
+                self.search_generation = self.generation
+                self.search = Search(position, self.TT_SIZE)
+                self.latest = None
+                self.pending = False
+            self.started_at = time.perf_counter()
+            self.last_emit = self.search_nodes = 0
+            self.search.iterate(on_iteration=self.report, on_progress=self.progress)
+            with self.condition:
+                stopped = self.search.stopped
+                self.search = None
+            if self.pending and not stopped:
+                self.emit_latest(self.search_nodes)  # Последний результат законченного анализа
+
+    def report(self, depth, score, nodes, pv):
+        """Вызывается перебором после каждой итерации углубления."""
+        if self.search.stopped:
+            return  # Результаты прерванного перебора не показываем
+        if self.search.position.side != WHITE:
+            score = -score
+        pv_text = ' '.join(board_move_name(move) for move in pv)
+        self.latest = (depth, score, pv_text)
+        self.pending = True
+        self.progress(nodes)
+
+    def progress(self, nodes):
+        """Вызывается перебором каждые несколько тысяч узлов, в том числе посреди итерации."""
+        self.search_nodes = nodes
+        if self.latest and not self.search.stopped and time.perf_counter() - self.last_emit >= self.INTERVAL:
+            self.emit_latest(nodes)
+
+    def emit_latest(self, nodes):
+        now = time.perf_counter()
+        depth, score, pv_text = self.latest
+        self.last_emit = now
+        self.pending = False
+        self.info.emit(self.search_generation, depth, score, int(nodes / max(now - self.started_at, 1e-6)),
+                       pv_text)
+
+
 class StatusWindow(QDialog):
     """Класс для отображения информации с бд в новом окне"""
     def __init__(self, db):
         super().__init__()
         self.setWindowTitle("История игр")
         self.setGeometry(300, 200, 600, 500)
+        self.db = db
 
         # Основной макет
         layout = QVBoxLayout()
@@ -587,6 +795,16 @@ class StatusWindow(QDialog):
         self.full_status_text.setReadOnly(True)
         layout.addWidget(self.full_status_text)
 
+        # Кнопка просмотра выбранной партии по ходам
+        self.replay_btn = QPushButton("Просмотр партии", self)
+        self.replay_btn.clicked.connect(self.show_replay)
+        layout.addWidget(self.replay_btn)
+
+        # Кнопка дерева дебютов по всем партиям
+        self.tree_btn = QPushButton("Дерево дебютов", self)
+        self.tree_btn.clicked.connect(self.show_opening_tree)
+        layout.addWidget(self.tree_btn)
+
         self.setLayout(layout)
 
         # Загрузка данных из базы
@@ -612,6 +830,142 @@ class StatusWindow(QDialog):
             full_status = self.table.item(row, column).text()
             self.full_status_text.setText(full_status)
 
+    def show_replay(self):
+        """Открывает просмотр выбранной партии."""
+        row = self.table.currentRow()
+        if row < 0:
+            return
+        moves = self.db.get_moves(int(self.table.item(row, 0).text()))
+        if not moves:
+            QMessageBox.information(self, "Просмотр партии", "Для этой партии ходы не сохранены.")
+            return
+        replay_window = ReplayWindow(moves)
+        replay_window.exec()
+
+    def show_opening_tree(self):
+        """Открывает дерево дебютов."""
+        explorer_window = OpeningExplorerWindow(self.db.tree)
+        explorer_window.exec()
+
+
+class BoardView(QWidget):
+    """Виджет доски только для отображения позиции."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.figures = []
+        self.setFixedSize(QSize(480, 480))
+
+    def set_position(self, position):
+        self.figures = figures_from_position(position)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        square_size = min(self.width(), self.height()) // 8
+        draw_board(painter, square_size, self.figures)
+
+
+class ReplayWindow(QDialog):
+    """Просмотр сохраненной партии: переход по ходам и ползунок."""
+    def __init__(self, moves):
+        super().__init__()
+        self.setWindowTitle("Просмотр партии")
+        self.replay = GameReplay(moves)
+
+        layout = QVBoxLayout()
+        self.board = BoardView(self)
+        layout.addWidget(self.board)
+
+        # Ползунок для быстрого перехода к любому полуходу
+        self.slider = QSlider(Qt.Orientation.Horizontal, self)
+        self.slider.setRange(0, len(self.replay))
+        self.slider.valueChanged.connect(self.show_ply)
+        layout.addWidget(self.slider)
+
+        # Кнопки навигации
+        buttons = QHBoxLayout()
+        for text, handler in (("<<", lambda: self.slider.setValue(0)),
+                              ("<", lambda: self.slider.setValue(self.slider.value() - 1)),
+                              (">", lambda: self.slider.setValue(self.slider.value() + 1)),
+                              (">>", lambda: self.slider.setValue(len(self.replay)))):
+            button = QPushButton(text, self)
+            button.clicked.connect(handler)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+
+        self.ply_label = QLabel(self)
+        layout.addWidget(self.ply_label)
+        self.setLayout(layout)
+
+        self.show_ply(0)
+
+    def show_ply(self, ply):
+        """Показывает позицию после ply полуходов."""
+        self.board.set_position(self.replay.seek(ply))
+        last_move = f", ход {board_move_name(self.replay.moves[ply - 1])}" if ply else ""
+        self.ply_label.setText(f"Полуход {ply} из {len(self.replay)}{last_move}")
+
+
+class OpeningExplorerWindow(QDialog):
+    """Дерево дебютов: продолжения из текущей позиции со статистикой партий."""
+    def __init__(self, tree):
+        super().__init__()
+        self.setWindowTitle("Дерево дебютов")
+        self.tree = tree
+        self.position = Position.initial()
+        self.children = []  # Продолжения текущей позиции
+
+        layout = QHBoxLayout()
+        self.board = BoardView(self)
+        layout.addWidget(self.board)
+
+        right = QVBoxLayout()
+        self.path_label = QLabel(self)
+        self.path_label.setWordWrap(True)
+        right.addWidget(self.path_label)
+
+        # Таблица продолжений: клик по строке делает ход
+        self.table = QTableWidget(self)
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels(["Ход", "Партий", "Белые", "Ничьи", "Черные", "Не окончены",
+                                              "Последняя"])
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.cellClicked.connect(self.play_continuation)
+        right.addWidget(self.table)
+
+        self.back_btn = QPushButton("Назад", self)
+        self.back_btn.clicked.connect(self.take_back)
+        right.addWidget(self.back_btn)
+        layout.addLayout(right)
+        self.setLayout(layout)
+
+        self.show_node()
+
+    def show_node(self):
+        """Показывает текущую позицию и её продолжения."""
+        self.board.set_position(self.position)
+        self.path_label.setText(' '.join(board_move_name(undo[0]) for undo in self.position.history)
+                                or "Начальная позиция")
+        self.back_btn.setEnabled(bool(self.position.history))
+
+        self.children = self.tree.children(self.position)
+        self.table.setRowCount(len(self.children))
+        for row_idx, child in enumerate(self.children):
+            values = [board_move_name(parse_move(child['move'])), child['games'], f"{child['white']:.0%}",
+                      f"{child['draws']:.0%}", f"{child['black']:.0%}", f"{child['unfinished']:.0%}",
+                      child['last_date']]
+            for col_idx, value in enumerate(values):
+                self.table.setItem(row_idx, col_idx, QTableWidgetItem(str(value)))
+
+    def play_continuation(self, row, column):
+        self.position.make_move(parse_move(self.children[row]['move']))
+        self.show_node()
+
+    def take_back(self):
+        if self.position.history:
+            self.position.unmake_move()
+            self.show_node()
+
 
 def except_hook(cls, exception, traceback):
     sys.__excepthook__(cls, exception, traceback)
@@ -0,0 +1,191 @@
+"""Дерево дебютов по архиву партий с заранее посчитанной статистикой.
+
+Для каждой пары (хеш позиции, ход) в таблице opening_tree хранится число партий,
+побед белых, ничьих, побед чёрных и дата последней партии. Таблица пополняется
+при записи каждой партии, поэтому запрос одного узла - это поиск по первичному
+ключу и не зависит от размера архива.
+Перестроение по таблице games: python opening_tree.py --rebuild [chess_games.db]
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from position import Position, WHITE, move_name, parse_move
+
+WHITE_WINS, DRAW, BLACK_WINS, UNFINISHED = '1-0', '1/2-1/2', '0-1', '*'
+REBUILD_BATCH = 10000  # Партий на одну транзакцию при перестроении
+
+
+def position_key(position):
+    """Хеш позиции в виде знакового 64-битного числа, как требует SQLite."""
+    return position.hash - (1 << 64) if position.hash >= 1 << 63 else position.hash
+
+
+def game_result(moves, start=None):
+    """Результат партии по ходам: мат, пат или незаконченная партия."""
+    position = (start or Position.initial()).copy()
+    for move in moves:
+        position.make_move(parse_move(move) if isinstance(move, str) else move)
+    if position.has_legal_move():
+        return UNFINISHED
+    if not position.in_check():
+        return DRAW
+    return BLACK_WINS if position.side == WHITE else WHITE_WINS
+
+
+def _game_rows(moves, game_date):
+    """Строки (ключ, ход, партии, белые, ничьи, чёрные, дата) для одной партии."""
+    result = game_result(moves)
+    white, draw, black = result == WHITE_WINS, result == DRAW, result == BLACK_WINS
+    position = Position.initial()
+    rows = []
+    for text in moves:
+        rows.append((position_key(position), text, 1, int(white), int(draw), int(black), game_date))
+        position.make_move(parse_move(text))
+    return rows
+
+
+class OpeningTree:
+    """Агрегированная статистика продолжений, хранится в той же базе, что и партии."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.create_table()
+
+    def create_table(self):
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS opening_tree (
+            position_hash INTEGER,
+            move TEXT,
+            games INTEGER,
+            white_wins INTEGER,
+            draws INTEGER,
+            black_wins INTEGER,
+            last_date TEXT,
+            PRIMARY KEY (position_hash, move)
+        ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def _upsert(self, rows):
+        self.cursor.executemany("""
+        INSERT INTO opening_tree (position_hash, move, games, white_wins, draws, black_wins, last_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (position_hash, move) DO UPDATE SET
+            games = games + excluded.games,
+            white_wins = white_wins + excluded.white_wins,
+            draws = draws + excluded.draws,
+            black_wins = black_wins + excluded.black_wins,
+            last_date = max(last_date, excluded.last_date)
+        """, rows)
+
+    def add_game(self, moves, game_date, commit=True):
+        """Добавляет партию в статистику (вызывается при записи партии в базу)."""
+        self._upsert(_game_rows(moves, game_date))
+        if commit:
+            self.conn.commit()
+
+    def rebuild(self):
+        """Пересчитывает всю таблицу по сохранённым партиям. Возвращает число учтённых партий."""
+        self.cursor.execute("DELETE FROM opening_tree")
+        # В базах, которые ещё не открывались интерфейсом с сохранением ходов, колонки moves нет
+        columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(games)")]
+        if 'moves' not in columns:
+            self.conn.commit()
+            return 0
+        reader = self.conn.cursor()
+        reader.execute("SELECT game_date, moves FROM games WHERE moves IS NOT NULL AND moves != ''")
+        count = 0
+        while True:
+            games = reader.fetchmany(REBUILD_BATCH)
+            if not games:
+                break
+            # Сначала суммируем пачку в памяти, чтобы общие позиции дебюта писались один раз
+            totals = {}
+            for game_date, moves in games:
+                for key, move, _, white, draw, black, date in _game_rows(moves.split(), game_date):
+                    total = totals.get((key, move))
+                    if total:
+                        total[0] += 1
+                        total[1] += white
+                        total[2] += draw
+                        total[3] += black
+                        total[4] = max(total[4], date)
+                    else:
+                        totals[(key, move)] = [1, white, draw, black, date]
+            self._upsert([key + tuple(total) for key, total in totals.items()])
+            count += len(games)
+        self.conn.commit()
+        return count
+
+    def children(self, position):
+        """Продолжения из позиции, самые частые первыми.
+
+        Returns:
+            list: Словари с ключами move, games, white, draws, black, unfinished
+                (доли от 0 до 1, в сумме 1) и last_date.
+        """
+        self.cursor.execute("""
+        SELECT move, games, white_wins, draws, black_wins, last_date
+        FROM opening_tree WHERE position_hash = ? ORDER BY games DESC
+        """, (position_key(position),))
+        return [{'move': move, 'games': games, 'white': white / games, 'draws': draws / games,
+                 'black': black / games, 'unfinished': (games - white - draws - black) / games,
+                 'last_date': last_date}
+                for move, games, white, draws, black, last_date in self.cursor.fetchall()]
+
+
+def benchmark(games=20000, lookups=1000, seed=0):
+    """Заполняет временную базу случайными партиями и замеряет время запроса узла.
+
+    Returns:
+        tuple: (среднее время запроса, максимальное) в миллисекундах.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE games (id INTEGER PRIMARY KEY AUTOINCREMENT, game_date TEXT, "
+                 "game_status TEXT, moves TEXT)")
+    for index in range(games):
+        position = Position.initial()
+        moves = []
+        for _ in range(rng.randrange(10, 40)):
+            legal = position.legal_moves()
+            if not legal:
+                break
+            move = rng.choice(legal)
+            position.make_move(move)
+            moves.append(move_name(move))
+        conn.execute("INSERT INTO games (game_date, game_status, moves) VALUES (?, ?, ?)",
+                     (f"2024-01-01 00:00:{index % 60:02d}", '', ' '.join(moves)))
+    tree = OpeningTree(conn)
+    tree.rebuild()
+
+    # Запросы по позициям, встречающимся в партиях: корень и случайные узлы по популярным ходам
+    timings = []
+    for _ in range(lookups):
+        position = Position.initial()
+        for _ in range(rng.randrange(6)):
+            started = time.perf_counter()
+            children = tree.children(position)
+            timings.append(time.perf_counter() - started)
+            if not children:
+                break
+            position.make_move(parse_move(rng.choice(children[:3])['move']))
+    return sum(timings) / len(timings) * 1000, max(timings) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Дерево дебютов по архиву партий')
+    parser.add_argument('db', nargs='?', default='chess_games.db')
+    parser.add_argument('--rebuild', action='store_true', help='пересчитать статистику по таблице games')
+    parser.add_argument('--benchmark', type=int, metavar='GAMES', help='замерить запросы на случайных партиях')
+    args = parser.parse_args()
+    if args.rebuild:
+        connection = sqlite3.connect(args.db)
+        print(f"Учтено партий: {OpeningTree(connection).rebuild()}")
+        connection.close()
+    if args.benchmark:
+        average, worst = benchmark(args.benchmark)
+        print(f"Запрос узла: в среднем {average:.3f} мс, максимум {worst:.3f} мс")
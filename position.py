@@ -0,0 +1,447 @@
+"""Позиция без Qt: доска 8x8, генерация ходов и make/unmake.
+
+Координаты совпадают с main.py: x - столбец (0..7, a-h), y - ряд (0..7),
+белые стоят на рядах 0-1 и ходят пешками в сторону y = 7.
+Клетка кодируется индексом sq = y * 8 + x.
+Правила повторяют генераторы valid_moves из main.py: без рокировки и взятия на проходе.
+"""
+import random
+
+WHITE = 'white'
+BLACK = 'black'
+
+KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN = 'K', 'Q', 'R', 'B', 'N', 'P'
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+# Соответствие имён классов фигур из main.py и кодов фигур
+PIECE_KINDS = {
+    'King': KING, 'Queen': QUEEN, 'Rook': ROOK,
+    'Bishop': BISHOP, 'Knight': KNIGHT, 'Pawn': PAWN
+}
+PIECE_NAMES = {kind: name for name, kind in PIECE_KINDS.items()}
+
+
+def opponent(color):
+    """Возвращает цвет противника."""
+    return BLACK if color == WHITE else WHITE
+
+
+def square(x, y):
+    """Индекс клетки по координатам."""
+    return y * 8 + x
+
+
+def square_name(sq):
+    """Название клетки в привычной записи, например 'e2'."""
+    return f"{chr(ord('a') + sq % 8)}{sq // 8 + 1}"
+
+
+def move_name(move):
+    """Ход в координатной записи: 'e2e4', 'a7a8q'."""
+    frm, to, promotion = move
+    name = square_name(frm) + square_name(to)
+    if promotion:
+        name += promotion.lower()
+    return name
+
+
+def parse_square(name):
+    """Индекс клетки по названию, например 'e2'."""
+    if len(name) != 2 or name[0] not in 'abcdefgh' or name[1] not in '12345678':
+        raise ValueError(f"Некорректная клетка: {name!r}")
+    return square(ord(name[0]) - ord('a'), int(name[1]) - 1)
+
+
+def parse_move(text):
+    """Ход из координатной записи ('e2e4', 'a7a8q') в кортеж (откуда, куда, превращение)."""
+    if len(text) not in (4, 5) or (len(text) == 5 and text[4].upper() not in PROMOTIONS):
+        raise ValueError(f"Некорректный ход: {text!r}")
+    promotion = text[4].upper() if len(text) > 4 else None
+    return parse_square(text[:2]), parse_square(text[2:4]), promotion
+
+
+def _targets(offsets):
+    """Предрасчёт клеток, достижимых одним шагом из каждой клетки."""
+    table = []
+    for sq in range(64):
+        x, y = sq % 8, sq // 8
+        table.append(tuple(square(x + dx, y + dy) for dx, dy in offsets
+                           if 0 <= x + dx < 8 and 0 <= y + dy < 8))
+    return tuple(table)
+
+
+def _rays(directions):
+    """Предрасчёт лучей для дальнобойных фигур: для каждой клетки список лучей."""
+    table = []
+    for sq in range(64):
+        x, y = sq % 8, sq // 8
+        rays = []
+        for dx, dy in directions:
+            ray = []
+            nx, ny = x + dx, y + dy
+            while 0 <= nx < 8 and 0 <= ny < 8:
+                ray.append(square(nx, ny))
+                nx += dx
+                ny += dy
+            if ray:
+                rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return tuple(table)
+
+
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_OFFSETS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+ORTHOGONAL = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+KNIGHT_TARGETS = _targets(KNIGHT_OFFSETS)
+KING_TARGETS = _targets(KING_OFFSETS)
+ROOK_RAYS = _rays(ORTHOGONAL)
+BISHOP_RAYS = _rays(DIAGONAL)
+QUEEN_RAYS = tuple(r + b for r, b in zip(ROOK_RAYS, BISHOP_RAYS))
+# Клетки, которые бьёт пешка данного цвета с данной клетки
+PAWN_ATTACKS = {
+    WHITE: _targets(((-1, 1), (1, 1))),
+    BLACK: _targets(((-1, -1), (1, -1))),
+}
+SLIDER_RAYS = {ROOK: ROOK_RAYS, BISHOP: BISHOP_RAYS, QUEEN: QUEEN_RAYS}
+
+# Случайные ключи Цобриста для хеша позиции (фиксированное зерно - одинаковые хеши между запусками)
+_rng = random.Random(2024)
+ZOBRIST = {(color, kind): tuple(_rng.getrandbits(64) for _ in range(64))
+           for color in (WHITE, BLACK) for kind in (KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN)}
+ZOBRIST_SIDE = _rng.getrandbits(64)
+
+INITIAL_SETUP = {
+    0: [ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK],
+    1: [PAWN] * 8,
+}
+
+
+class Position:
+    """Позиция: расстановка фигур и очередь хода.
+
+    Фигура хранится кортежем (цвет, код), например ('white', 'Q').
+    Ход - кортеж (откуда, куда, превращение), где превращение - код фигуры или None.
+    """
+
+    def __init__(self):
+        self.board = [None] * 64  # Содержимое клеток
+        self.side = WHITE  # Чей ход
+        self.kings = {WHITE: None, BLACK: None}  # Клетки королей
+        self.history = []  # Стек для отмены ходов
+        self.hash = 0  # Хеш Цобриста, обновляется в make/unmake
+
+    @classmethod
+    def initial(cls):
+        """Начальная расстановка, как в ChessBoard.create_pieces."""
+        position = cls()
+        for y, kinds in INITIAL_SETUP.items():
+            for x, kind in enumerate(kinds):
+                position.put(square(x, y), (WHITE, kind))
+                position.put(square(x, 7 - y), (BLACK, kind))
+        return position
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Позиция из записи FEN. Права на рокировку и поле взятия на проходе игнорируются."""
+        fields = fen.split()
+        position = cls()
+        for row, line in enumerate(fields[0].split('/')):
+            x = 0
+            for char in line:
+                if char.isdigit():
+                    x += int(char)
+                    continue
+                color = WHITE if char.isupper() else BLACK
+                position.put(square(x, 7 - row), (color, char.upper()))
+                x += 1
+        if len(fields) > 1 and fields[1] == 'b':
+            position.side = BLACK
+            position.hash ^= ZOBRIST_SIDE
+        return position
+
+    def fen(self):
+        """Запись позиции в FEN (без рокировок и взятия на проходе)."""
+        rows = []
+        for y in range(7, -1, -1):
+            row = ''
+            empty = 0
+            for x in range(8):
+                piece = self.board[square(x, y)]
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += piece[1] if piece[0] == WHITE else piece[1].lower()
+            rows.append(row + (str(empty) if empty else ''))
+        return f"{'/'.join(rows)} {'w' if self.side == WHITE else 'b'} - - 0 1"
+
+    @classmethod
+    def from_figures(cls, figures, side=WHITE):
+        """Строит позицию по списку фигур из ChessBoard.figures."""
+        position = cls()
+        for figure in figures:
+            kind = PIECE_KINDS[figure.__class__.__name__]
+            position.put(square(figure.x, figure.y), (figure.color, kind))
+        if side == BLACK:
+            position.side = BLACK
+            position.hash ^= ZOBRIST_SIDE
+        return position
+
+    def copy(self):
+        """Копия позиции без истории ходов."""
+        position = Position()
+        position.board = self.board[:]
+        position.side = self.side
+        position.kings = dict(self.kings)
+        position.hash = self.hash
+        return position
+
+    def put(self, sq, piece):
+        """Ставит фигуру на клетку (используется при расстановке)."""
+        self.board[sq] = piece
+        self.hash ^= ZOBRIST[piece][sq]
+        if piece[1] == KING:
+            self.kings[piece[0]] = sq
+
+    def get_piece(self, x, y):
+        return self.board[square(x, y)]
+
+    def is_empty(self, x, y):
+        return self.board[square(x, y)] is None
+
+    def pieces(self):
+        """Перебирает (клетка, фигура) для всех фигур на доске."""
+        for sq, piece in enumerate(self.board):
+            if piece:
+                yield sq, piece
+
+    def is_attacked(self, sq, by):
+        """Бьёт ли сторона by клетку sq."""
+        board = self.board
+        for target in KNIGHT_TARGETS[sq]:
+            if board[target] == (by, KNIGHT):
+                return True
+        for target in KING_TARGETS[sq]:
+            if board[target] == (by, KING):
+                return True
+        # Пешка цвета by бьёт sq, если стоит там, куда била бы пешка противника с sq
+        for target in PAWN_ATTACKS[opponent(by)][sq]:
+            if board[target] == (by, PAWN):
+                return True
+        for ray in ROOK_RAYS[sq]:
+            for target in ray:
+                piece = board[target]
+                if piece:
+                    if piece[0] == by and piece[1] in (ROOK, QUEEN):
+                        return True
+                    break
+        for ray in BISHOP_RAYS[sq]:
+            for target in ray:
+                piece = board[target]
+                if piece:
+                    if piece[0] == by and piece[1] in (BISHOP, QUEEN):
+                        return True
+                    break
+        return False
+
+    def least_valuable_attacker(self, sq, by):
+        """Клетка самой дешёвой фигуры стороны by, бьющей sq, или None."""
+        board = self.board
+        for target in PAWN_ATTACKS[opponent(by)][sq]:
+            if board[target] == (by, PAWN):
+                return target
+        for target in KNIGHT_TARGETS[sq]:
+            if board[target] == (by, KNIGHT):
+                return target
+        found = {}
+        for rays, kinds in ((BISHOP_RAYS, (BISHOP, QUEEN)), (ROOK_RAYS, (ROOK, QUEEN))):
+            for ray in rays[sq]:
+                for target in ray:
+                    piece = board[target]
+                    if piece:
+                        if piece[0] == by and piece[1] in kinds:
+                            found.setdefault(piece[1], target)
+                        break
+        for kind in (BISHOP, ROOK, QUEEN):
+            if kind in found:
+                return found[kind]
+        for target in KING_TARGETS[sq]:
+            if board[target] == (by, KING):
+                return target
+        return None
+
+    def in_check(self, color=None):
+        """Находится ли король стороны color (по умолчанию - ходящей) под шахом."""
+        color = color or self.side
+        king = self.kings[color]
+        if king is None:
+            return False
+        return self.is_attacked(king, opponent(color))
+
+    def pseudo_moves(self):
+        """Все ходы ходящей стороны без проверки, остаётся ли король под шахом."""
+        return self.generate_moves(True, True)
+
+    def captures(self):
+        """Только взятия и превращения - для форсированного перебора."""
+        return self.generate_moves(True, False)
+
+    def quiet_moves(self):
+        """Только тихие ходы (без взятий и превращений)."""
+        return self.generate_moves(False, True)
+
+    def generate_moves(self, captures, quiets):
+        """Псевдолегальные ходы ходящей стороны.
+
+        Args:
+            captures (bool): Включать взятия и превращения.
+            quiets (bool): Включать тихие ходы.
+        """
+        side = self.side
+        moves = []
+        for frm, piece in enumerate(self.board):
+            if piece and piece[0] == side:
+                self._moves_from(frm, piece[1], captures, quiets, moves)
+        return moves
+
+    def is_pseudo_legal(self, move):
+        """Возможен ли ход в текущей позиции (без проверки шаха), например ход из хеш-таблицы."""
+        piece = self.board[move[0]]
+        if not piece or piece[0] != self.side:
+            return False
+        moves = []
+        self._moves_from(move[0], piece[1], True, True, moves)
+        return move in moves
+
+    def _moves_from(self, frm, kind, captures, quiets, moves):
+        board = self.board
+        side = self.side
+        if kind == PAWN:
+            self._pawn_moves(frm, captures, quiets, moves)
+        elif kind == KNIGHT or kind == KING:
+            for to in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[frm]:
+                target = board[to]
+                if target is None:
+                    if quiets:
+                        moves.append((frm, to, None))
+                elif target[0] != side and captures:
+                    moves.append((frm, to, None))
+        else:
+            for ray in SLIDER_RAYS[kind][frm]:
+                for to in ray:
+                    target = board[to]
+                    if target:
+                        if target[0] != side and captures:  # Захват фигуры противника
+                            moves.append((frm, to, None))
+                        break
+                    if quiets:
+                        moves.append((frm, to, None))
+
+    def _pawn_moves(self, frm, captures, quiets, moves):
+        board = self.board
+        side = self.side
+        step = 8 if side == WHITE else -8
+        start_rank, last_rank = (1, 7) if side == WHITE else (6, 0)
+        to = frm + step
+        if 0 <= to < 64 and board[to] is None:
+            # Превращение относится к форсированным ходам, как и взятие
+            if to // 8 == last_rank:
+                if captures:
+                    self._add_promotions(frm, to, moves)
+            elif quiets:
+                moves.append((frm, to, None))
+                # Два поля вперёд только с начальной позиции
+                if frm // 8 == start_rank and board[to + step] is None:
+                    moves.append((frm, to + step, None))
+        if captures:
+            for to in PAWN_ATTACKS[side][frm]:
+                target = board[to]
+                if target and target[0] != side:
+                    if to // 8 == last_rank:
+                        self._add_promotions(frm, to, moves)
+                    else:
+                        moves.append((frm, to, None))
+
+    @staticmethod
+    def _add_promotions(frm, to, moves):
+        for promotion in PROMOTIONS:
+            moves.append((frm, to, promotion))
+
+    def legal_moves(self):
+        """Ходы, после которых собственный король не под шахом."""
+        side = self.side
+        legal = []
+        for move in self.pseudo_moves():
+            self.make_move(move)
+            if not self.in_check(side):
+                legal.append(move)
+            self.unmake_move()
+        return legal
+
+    def has_legal_move(self):
+        """Есть ли у ходящей стороны хоть один ход (без полной генерации легальных ходов)."""
+        side = self.side
+        for move in self.pseudo_moves():
+            self.make_move(move)
+            legal = not self.in_check(side)
+            self.unmake_move()
+            if legal:
+                return True
+        return False
+
+    def is_legal(self, move):
+        """Допустим ли ход по правилам, включая проверку шаха своему королю."""
+        if not self.is_pseudo_legal(move):
+            return False
+        side = self.side
+        self.make_move(move)
+        legal = not self.in_check(side)
+        self.unmake_move()
+        return legal
+
+    def make_move(self, move):
+        """Делает ход и запоминает всё необходимое для unmake_move.
+
+        Returns:
+            tuple: (ход, походившая фигура, взятая фигура или None, хеш до хода).
+        """
+        frm, to, promotion = move
+        board = self.board
+        piece = board[frm]
+        captured = board[to]
+        board[frm] = None
+        moved = (piece[0], promotion) if promotion else piece
+        board[to] = moved
+        undo = (move, piece, captured, self.hash)
+        self.hash ^= ZOBRIST[piece][frm] ^ ZOBRIST[moved][to] ^ ZOBRIST_SIDE
+        if captured:
+            self.hash ^= ZOBRIST[captured][to]
+            if captured[1] == KING:
+                self.kings[captured[0]] = None
+        if piece[1] == KING:
+            self.kings[piece[0]] = to
+        self.history.append(undo)
+        self.side = opponent(self.side)
+        return undo
+
+    def is_repetition(self):
+        """Встречалась ли текущая позиция раньше в истории ходов."""
+        return any(undo[3] == self.hash for undo in self.history)
+
+    def unmake_move(self):
+        """Отменяет последний сделанный ход."""
+        undo = self.history.pop()
+        (frm, to, _), piece, captured, self.hash = undo
+        board = self.board
+        board[frm] = piece
+        board[to] = captured
+        if piece[1] == KING:
+            self.kings[piece[0]] = frm
+        if captured and captured[1] == KING:
+            self.kings[captured[0]] = to
+        self.side = opponent(self.side)
+        return undo
@@ -0,0 +1,110 @@
+"""Быстрый просмотр сохранённой партии с переходом к любому полуходу.
+
+Каждые interval полуходов запоминается снимок позиции, поэтому переход к любому
+полуходу стоит не больше interval ходов от ближайшего снимка.
+"""
+import random
+import time
+
+from position import Position, parse_move
+
+DEFAULT_INTERVAL = 16
+
+
+class GameReplay:
+    """Позиции партии по номеру полухода.
+
+    Args:
+        moves (list): Ходы в координатной записи ('e2e4') или кортежами.
+        start (Position): Начальная позиция (по умолчанию - стандартная расстановка).
+        interval (int): Через сколько полуходов делать снимок позиции.
+    """
+
+    def __init__(self, moves, start=None, interval=DEFAULT_INTERVAL):
+        self.moves = [parse_move(move) if isinstance(move, str) else move for move in moves]
+        self.interval = interval
+        self.snapshots = []  # Позиции на полуходах 0, interval, 2 * interval, ...
+        position = (start or Position.initial()).copy()
+        for ply, move in enumerate(self.moves):
+            if ply % interval == 0:
+                self.snapshots.append(position.copy())
+            position.make_move(move)
+        if len(self.moves) % interval == 0:
+            self.snapshots.append(position.copy())
+        self.position = self.snapshots[0].copy()
+        self.ply = 0
+
+    def __len__(self):
+        return len(self.moves)
+
+    def seek(self, ply):
+        """Переходит к позиции после ply полуходов и возвращает её."""
+        ply = max(0, min(ply, len(self.moves)))
+        distance = ply - self.ply
+        if 0 <= distance <= self.interval:
+            pass  # Ближе дойти вперёд от текущей позиции
+        elif distance < 0 and -distance <= min(self.interval, len(self.position.history)):
+            for _ in range(-distance):
+                self.position.unmake_move()
+            self.ply = ply
+            return self.position
+        else:
+            self.position = self.snapshots[ply // self.interval].copy()
+            self.ply = ply // self.interval * self.interval
+        for move in self.moves[self.ply:ply]:
+            self.position.make_move(move)
+        self.ply = ply
+        return self.position
+
+    def forward(self):
+        return self.seek(self.ply + 1)
+
+    def back(self):
+        return self.seek(self.ply - 1)
+
+
+def random_game(plies, seed=0):
+    """Случайная партия длиной plies полуходов (для замеров)."""
+    rng = random.Random(seed)
+    while True:
+        position = Position.initial()
+        moves = []
+        while len(moves) < plies:
+            legal = position.legal_moves()
+            if not legal:
+                break
+            move = rng.choice(legal)
+            position.make_move(move)
+            moves.append(move)
+        if len(moves) == plies:
+            return moves
+        seed += 1
+        rng = random.Random(seed)
+
+
+def benchmark(plies=300, intervals=(1, 8, 16, 32, None), seeks=2000):
+    """Задержка перехода к случайному полуходу партии длиной plies.
+
+    interval None означает отсутствие снимков: каждая позиция строится с начала партии.
+
+    Returns:
+        dict: {interval: (средняя задержка, максимальная задержка)} в миллисекундах.
+    """
+    moves = random_game(plies)
+    rng = random.Random(1)
+    targets = [rng.randrange(plies + 1) for _ in range(seeks)]
+    results = {}
+    for interval in intervals:
+        replay = GameReplay(moves, interval=interval or plies + 1)
+        timings = []
+        for ply in targets:
+            started = time.perf_counter()
+            replay.seek(ply)
+            timings.append(time.perf_counter() - started)
+        results[interval] = (sum(timings) / len(timings) * 1000, max(timings) * 1000)
+    return results
+
+
+if __name__ == '__main__':
+    for interval, (average, worst) in benchmark().items():
+        print(f"снимок каждые {interval or '-'} полуходов: в среднем {average:.3f} мс, максимум {worst:.3f} мс")
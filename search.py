@@ -0,0 +1,372 @@
+"""Перебор: альфа-бета с итеративным углублением и форсированным (quiescence) перебором.
+
+Ходы выдаются поэтапно, чтобы большинство узлов отсекалось раньше,
+чем дело дойдёт до генерации тихих ходов:
+ход из хеш-таблицы, выгодные взятия (MVV-LVA + размен SEE), ходы-убийцы,
+тихие ходы по истории, невыгодные взятия.
+"""
+import time
+
+from evaluation import IncrementalEvaluator
+from position import KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN, opponent
+
+MATE = 100000  # Оценка мата (минус число полуходов до него)
+INFINITY = MATE + 1
+MAX_PLY = 64
+
+# Стоимость фигур для упорядочивания взятий и SEE
+SEE_VALUES = {PAWN: 100, KNIGHT: 320, BISHOP: 330, ROOK: 500, QUEEN: 900, KING: 20000}
+
+# Типы записей в хеш-таблице
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Как часто (в узлах) проверять ограничения по времени и остановку
+CHECK_EVERY = 2048
+
+
+def mvv_lva(position, move):
+    """Ценность взятия: самая ценная жертва самой дешёвой фигурой."""
+    frm, to, promotion = move
+    victim = position.board[to]
+    score = SEE_VALUES[victim[1]] * 10 if victim else 0
+    if promotion:
+        score += SEE_VALUES[promotion] * 10
+    return score - SEE_VALUES[position.board[frm][1]] // 10
+
+
+def see(position, move):
+    """Статическая оценка размена на клетке хода (без учёта связок).
+
+    Фигуры по очереди снимаются с доски, поэтому дальнобойные фигуры
+    за ними (рентген) учитываются автоматически.
+    """
+    board = position.board
+    frm, to, promotion = move
+    piece = board[frm]
+    target = board[to]
+    gains = [SEE_VALUES[target[1]] if target else 0]
+    removed = [(frm, piece)]
+    board[frm] = None
+    on_square = SEE_VALUES[promotion or piece[1]]
+    side = opponent(piece[0])
+    while True:
+        sq = position.least_valuable_attacker(to, side)
+        if sq is None:
+            break
+        attacker = board[sq]
+        if attacker[1] == KING and position.least_valuable_attacker(to, opponent(side)) is not None:
+            break  # Король не может бить на защищённую клетку
+        gains.append(on_square - gains[-1])
+        removed.append((sq, attacker))
+        board[sq] = None
+        on_square = SEE_VALUES[attacker[1]]
+        side = opponent(side)
+    for sq, removed_piece in removed:
+        board[sq] = removed_piece
+    while len(gains) > 1:
+        last = gains.pop()
+        gains[-1] = -max(-gains[-1], last)
+    return gains[0]
+
+
+class Search:
+    """Поиск лучшего хода в позиции.
+
+    Позиция изменяется во время перебора и восстанавливается по его окончании.
+    Остановить перебор из другого потока можно методом stop().
+    """
+
+    def __init__(self, position, tt_size=1 << 20):
+        self.position = position
+        self.evaluator = IncrementalEvaluator(position)
+        self.tt = {}  # Хеш-таблица: хеш -> (глубина, тип, оценка, ход)
+        self.tt_size = tt_size  # Максимальное число записей
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = {}  # (фигура, клетка) -> вес тихого хода
+        self.pv_table = [[] for _ in range(MAX_PLY + 1)]
+        self.nodes = 0
+        self.stopped = False
+        self.deadline = None
+        self.node_limit = None
+        self.on_progress = None
+
+    def set_position(self, position):
+        """Переключает перебор на новую позицию, сохраняя хеш-таблицу и историю."""
+        self.position = position
+        self.evaluator = IncrementalEvaluator(position)
+
+    def clear(self):
+        """Забывает всё, что накоплено в прошлых переборах (новая партия)."""
+        self.tt.clear()
+        self.history.clear()
+
+    def stop(self):
+        """Просит перебор завершиться как можно скорее.
+
+        Флаг не сбрасывается в iterate, чтобы остановка, пришедшая до начала перебора,
+        не потерялась; перед повторным запуском его нужно сбросить вручную.
+        """
+        self.stopped = True
+
+    def iterate(self, max_depth=MAX_PLY, movetime=None, nodes=None, on_iteration=None, soft_time=None,
+                on_progress=None):
+        """Итеративное углубление.
+
+        Args:
+            max_depth (int): Максимальная глубина.
+            movetime (float): Ограничение по времени в секундах, прерывает итерацию.
+            nodes (int): Ограничение по числу узлов.
+            on_iteration (callable): Вызывается после каждой итерации
+                с аргументами (глубина, оценка, узлы, главный вариант).
+            soft_time (float): Время в секундах, после которого новая итерация не начинается.
+            on_progress (callable): Вызывается во время итерации каждые CHECK_EVERY узлов
+                с аргументом (узлы).
+
+        Returns:
+            tuple: (лучший ход или None, оценка).
+        """
+        self.evaluator.refresh()
+        self.nodes = 0
+        started = time.perf_counter()
+        self.deadline = started + movetime if movetime is not None else None
+        self.node_limit = nodes
+        self.on_progress = on_progress
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        best_move, best_score = None, 0
+        for depth in range(1, max_depth + 1):
+            score = self.negamax(depth, -INFINITY, INFINITY, 0)
+            if self.stopped and depth > 1:
+                break  # Незавершённую итерацию не используем
+            pv = self._extend_pv(self.pv_table[0], depth)
+            if pv:
+                best_move, best_score = pv[0], score
+            if on_iteration:
+                on_iteration(depth, score, self.nodes, pv)
+            if self.stopped or abs(score) >= MATE - MAX_PLY:
+                break
+            if soft_time is not None and time.perf_counter() - started >= soft_time:
+                break
+        if best_move is None:
+            legal = self.position.legal_moves()
+            best_move = legal[0] if legal else None
+        return best_move, best_score
+
+    def _extend_pv(self, pv, depth):
+        """Дополняет главный вариант ходами из хеш-таблицы.
+
+        Отсечения по хеш-таблице обрывают вариант, собранный при переборе,
+        поэтому после них вариант продолжается по сохранённым лучшим ходам.
+        """
+        position = self.position
+        pv = list(pv)
+        for move in pv:
+            position.make_move(move)
+        while len(pv) < depth:
+            entry = self.tt.get(position.hash)
+            if not entry or not entry[3] or not position.is_pseudo_legal(entry[3]):
+                break
+            side = position.side
+            position.make_move(entry[3])
+            if position.in_check(side) or position.is_repetition():
+                position.unmake_move()
+                break
+            pv.append(entry[3])
+        for _ in pv:
+            position.unmake_move()
+        return pv
+
+    def _check_limits(self):
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.stopped = True
+        if self.on_progress:
+            self.on_progress(self.nodes)
+
+    def negamax(self, depth, alpha, beta, ply):
+        position = self.position
+        self.pv_table[ply] = []
+        if ply and position.is_repetition():
+            return 0
+        in_check = position.in_check()
+        if in_check:
+            depth += 1  # Продление при шахе
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(alpha, beta, ply)
+
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True  # Лимит узлов проверяется на каждом узле, это одно сравнение
+        if self.nodes % CHECK_EVERY == 0:
+            self._check_limits()
+        if self.stopped:
+            return 0
+
+        entry = self.tt.get(position.hash)
+        hash_move = None
+        if entry:
+            entry_depth, flag, score, hash_move = entry
+            if ply and entry_depth >= depth:
+                score = self._score_from_tt(score, ply)
+                if (flag == EXACT or (flag == LOWER and score >= beta)
+                        or (flag == UPPER and score <= alpha)):
+                    return score
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, None
+        side = position.side
+        evaluator = self.evaluator
+        legal = 0
+        for move, is_quiet in self.ordered_moves(ply, hash_move):
+            evaluator.make_move(move)
+            if position.in_check(side):
+                evaluator.unmake_move()
+                continue
+            legal += 1
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            evaluator.unmake_move()
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score, best_move = score, move
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                    if score >= beta:
+                        if is_quiet:
+                            self._update_quiet_stats(move, depth, ply)
+                        break
+
+        if not legal:
+            return -MATE + ply if in_check else 0  # Мат или пат
+
+        if best_score >= beta:
+            flag = LOWER
+        elif best_score > original_alpha:
+            flag = EXACT
+        else:
+            flag = UPPER
+        self._store(depth, flag, self._score_to_tt(best_score, ply), best_move)
+        return best_score
+
+    def quiescence(self, alpha, beta, ply):
+        """Перебор только взятий, пока позиция не станет спокойной."""
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+        if self.nodes % CHECK_EVERY == 0:
+            self._check_limits()
+        if self.stopped:
+            return 0
+        stand_pat = self.evaluator.evaluate()
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        position = self.position
+        side = position.side
+        captures = position.captures()
+        captures.sort(key=lambda move: mvv_lva(position, move), reverse=True)
+        for move in captures:
+            # Взятия, проигрывающие материал, в форсированном переборе не смотрим
+            if self._may_lose_material(move) and see(position, move) < 0:
+                continue
+            self.evaluator.make_move(move)
+            if position.in_check(side):
+                self.evaluator.unmake_move()
+                continue
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            self.evaluator.unmake_move()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def ordered_moves(self, ply, hash_move):
+        """Поэтапная генерация ходов. Выдаёт пары (ход, тихий ли ход)."""
+        position = self.position
+        board = position.board
+
+        # 1. Ход из хеш-таблицы
+        if hash_move and position.is_pseudo_legal(hash_move):
+            yield hash_move, board[hash_move[1]] is None and not hash_move[2]
+        else:
+            hash_move = None
+
+        # 2. Выгодные и равные взятия по MVV-LVA; проигрывающие - в конец
+        captures = position.captures()
+        captures.sort(key=lambda move: mvv_lva(position, move), reverse=True)
+        losing = []
+        for move in captures:
+            if move == hash_move:
+                continue
+            if self._may_lose_material(move) and see(position, move) < 0:
+                losing.append(move)
+                continue
+            yield move, False
+
+        # 3. Ходы-убийцы, вызвавшие отсечение в соседних узлах на той же глубине
+        killers = [killer for killer in self.killers[ply]
+                   if killer and killer != hash_move and board[killer[1]] is None
+                   and position.is_pseudo_legal(killer)]
+        for killer in killers:
+            yield killer, True
+
+        # 4. Тихие ходы по таблице истории
+        quiets = position.quiet_moves()
+        history = self.history
+        quiets.sort(key=lambda move: history.get((board[move[0]], move[1]), 0), reverse=True)
+        for move in quiets:
+            if move != hash_move and move not in killers:
+                yield move, True
+
+        # 5. Проигрывающие взятия
+        for move in losing:
+            yield move, False
+
+    def _may_lose_material(self, move):
+        """Взятие заведомо не проигрывает, если жертва не дешевле бьющей фигуры."""
+        board = self.position.board
+        victim = board[move[1]]
+        if victim is None:
+            return not move[2]
+        return SEE_VALUES[board[move[0]][1]] > SEE_VALUES[victim[1]]
+
+    def _update_quiet_stats(self, move, depth, ply):
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        key = (self.position.board[move[0]], move[1])
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def _store(self, depth, flag, score, move):
+        if len(self.tt) >= self.tt_size:
+            self.tt.clear()  # Простая стратегия замещения: очищаем переполненную таблицу
+        self.tt[self.position.hash] = (depth, flag, score, move)
+
+    @staticmethod
+    def _score_to_tt(score, ply):
+        # Оценка мата хранится относительно текущего узла, а не корня
+        if score >= MATE - MAX_PLY:
+            return score + ply
+        if score <= -MATE + MAX_PLY:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_tt(score, ply):
+        if score >= MATE - MAX_PLY:
+            return score - ply
+        if score <= -MATE + MAX_PLY:
+            return score + ply
+        return score
+
+
+if __name__ == '__main__':
+    from position import Position, move_name
+
+    def report(depth, score, nodes, pv):
+        print(f"depth {depth} score {score} nodes {nodes} pv {' '.join(move_name(m) for m in pv)}")
+
+    started = time.perf_counter()
+    best, _ = Search(Position.initial()).iterate(max_depth=5, on_iteration=report)
+    print(f"bestmove {move_name(best)} ({time.perf_counter() - started:.1f} s)")
@@ -0,0 +1,207 @@
+"""Asyncio-сервер, на котором идёт сразу много партий.
+
+Протокол - JSON по строкам поверх TCP или Unix-сокета: каждый запрос - объект
+с полем "action", ответ - объект с "ok" и полем "id" из запроса (если он был).
+
+    {"action": "new"}                                 -> {"game": 1, ...}
+    {"action": "legal_moves", "game": 1}              -> {"moves": ["e2e4", ...]}
+    {"action": "move", "game": 1, "move": "e2e4"}     -> {"status": "active", ...}
+    {"action": "engine_move", "game": 1, "movetime": 200}
+    {"action": "state", "game": 1}
+    {"action": "close", "game": 1}
+
+Ходы движка считаются в пуле процессов, чтобы перебор не блокировал цикл событий.
+Запуск: python server.py [--port 8765 | --unix /tmp/chess.sock]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from position import Position, WHITE, BLACK, KING, move_name, parse_move
+from search import Search
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MOVETIME = 200  # Миллисекунды на ход движка по умолчанию
+MIN_MOVETIME = 10
+MAX_MOVETIME = 10000
+
+
+class GameError(Exception):
+    """Ошибка в запросе клиента: неизвестная партия, недопустимый ход и т.п."""
+
+
+def engine_search(fen, moves, movetime, depth):
+    """Ищет ход движка. Выполняется в отдельном процессе пула.
+
+    Позиция передаётся записью FEN и ходами после неё, чтобы учитывались повторения.
+    """
+    position = Position.from_fen(fen)
+    for text in moves:
+        position.make_move(parse_move(text))
+    kwargs = {'movetime': movetime / 1000}
+    if depth:
+        kwargs['max_depth'] = depth
+    best, _ = Search(position, tt_size=1 << 16).iterate(**kwargs)
+    return move_name(best) if best else None
+
+
+class Game:
+    """Состояние одной партии."""
+
+    def __init__(self, game_id, fen=None):
+        self.id = game_id
+        self.start_fen = fen or Position.initial().fen()
+        self.position = Position.from_fen(self.start_fen)
+        if any(self.position.board.count((color, KING)) != 1 for color in (WHITE, BLACK)):
+            raise GameError('в позиции должно быть ровно по одному королю у каждой стороны')
+        self.moves = []  # Сделанные ходы в координатной записи
+        self.status = 'active'  # active, checkmate или stalemate
+        self.winner = None
+        self.lock = asyncio.Lock()  # Не даёт двум ходам движка считаться одновременно
+        self.update_status()
+
+    def play(self, text):
+        """Делает ход и обновляет статус партии."""
+        if self.status != 'active':
+            raise GameError('партия окончена')
+        try:
+            move = parse_move(text)
+        except (ValueError, TypeError):
+            raise GameError(f'не удалось разобрать ход {text!r}')
+        if not self.position.is_legal(move):
+            raise GameError(f'недопустимый ход {text}')
+        self.position.make_move(move)
+        self.moves.append(text)
+        self.update_status()
+
+    def update_status(self):
+        """Определяет, не закончилась ли партия матом или патом."""
+        if not self.position.has_legal_move():
+            if self.position.in_check():
+                self.status = 'checkmate'
+                self.winner = BLACK if self.position.side == WHITE else WHITE
+            else:
+                self.status = 'stalemate'
+
+    def state(self):
+        return {
+            'game': self.id,
+            'fen': self.position.fen(),
+            'side': self.position.side,
+            'moves': self.moves,
+            'status': self.status,
+            'winner': self.winner,
+        }
+
+
+class GameServer:
+    """Хранилище партий и обработка запросов."""
+
+    def __init__(self, workers=None):
+        self.games = {}  # id партии -> Game
+        self.ids = itertools.count(1)
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    def game(self, request):
+        try:
+            return self.games[request['game']]
+        except KeyError:
+            raise GameError(f"партия {request.get('game')} не найдена")
+
+    async def handle(self, request):
+        """Выполняет один запрос и возвращает словарь ответа."""
+        action = request.get('action')
+        if action == 'new':
+            try:
+                game = Game(next(self.ids), request.get('fen'))
+            except (ValueError, KeyError, IndexError):
+                raise GameError('некорректная позиция FEN')
+            self.games[game.id] = game
+            return game.state()
+        if action == 'legal_moves':
+            game = self.game(request)
+            moves = game.position.legal_moves() if game.status == 'active' else []
+            return {'game': game.id, 'moves': [move_name(move) for move in moves]}
+        if action == 'move':
+            game = self.game(request)
+            async with game.lock:
+                game.play(request.get('move', ''))
+            return {'game': game.id, 'side': game.position.side, 'status': game.status, 'winner': game.winner}
+        if action == 'engine_move':
+            return await self.engine_move(self.game(request), request)
+        if action == 'state':
+            return self.game(request).state()
+        if action == 'close':
+            self.games.pop(self.game(request).id)
+            return {}
+        raise GameError(f'неизвестное действие {action!r}')
+
+    async def engine_move(self, game, request):
+        # Нулевое время перебор понял бы как отсутствие ограничения
+        movetime = max(MIN_MOVETIME, min(int(request.get('movetime', DEFAULT_MOVETIME)), MAX_MOVETIME))
+        depth = int(request['depth']) if request.get('depth') else None
+        async with game.lock:
+            if game.status != 'active':
+                raise GameError('партия окончена')
+            loop = asyncio.get_running_loop()
+            text = await loop.run_in_executor(self.executor, engine_search, game.start_fen,
+                                              list(game.moves), movetime, depth)
+            game.play(text)
+        return {'game': game.id, 'move': text, 'side': game.position.side,
+                'status': game.status, 'winner': game.winner}
+
+    async def serve_client(self, reader, writer):
+        """Обслуживает одно соединение: запросы выполняются по очереди."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    response = {'ok': True, **await self.handle(request)}
+                except GameError as error:
+                    response = {'ok': False, 'error': str(error)}
+                except (ValueError, TypeError, AttributeError):
+                    response = {'ok': False, 'error': 'некорректный запрос'}
+                if isinstance(request, dict) and 'id' in request:
+                    response['id'] = request['id']
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+async def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, workers=None):
+    game_server = GameServer(workers)
+    if unix:
+        server = await asyncio.start_unix_server(game_server.serve_client, path=unix)
+    else:
+        server = await asyncio.start_server(game_server.serve_client, host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Сервер шахматных партий')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help='путь к Unix-сокету вместо TCP')
+    parser.add_argument('--workers', type=int, help='число процессов для ходов движка')
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_server(args.host, args.port, args.unix, args.workers))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,26 @@
+"""Распределение времени на ход по времени на часах."""
+
+MOVE_OVERHEAD = 0.05  # Запас на передачу хода, секунды
+DEFAULT_MOVES_TO_GO = 30  # Сколько ходов ещё ожидается, если контроль не задан
+MIN_TIME = 0.01
+
+
+def allocate(time_left, increment=0.0, moves_to_go=None, overhead=MOVE_OVERHEAD):
+    """Время на текущий ход.
+
+    Args:
+        time_left (float): Остаток времени на часах, секунды.
+        increment (float): Добавка за ход, секунды.
+        moves_to_go (int): Ходов до следующего контроля (None - внезапная смерть).
+        overhead (float): Запас на задержки между процессами.
+
+    Returns:
+        tuple: (мягкий лимит, жёсткий лимит) в секундах.
+            После мягкого лимита новая итерация перебора не начинается,
+            по жёсткому перебор прерывается.
+    """
+    available = max(time_left - overhead, MIN_TIME)
+    moves = moves_to_go or DEFAULT_MOVES_TO_GO
+    soft = min(available / moves + increment * 0.75, available * 0.5)
+    hard = min(soft * 3, available * 0.8)
+    return max(soft, MIN_TIME), max(hard, MIN_TIME)
@@ -0,0 +1,180 @@
+"""UCI-интерфейс движка: команды читаются из stdin, ответы пишутся в stdout.
+
+Работает без Qt. Запуск: python uci.py
+"""
+import sys
+import threading
+import time
+
+import timeman
+from position import Position, WHITE, move_name, parse_move
+from search import Search, MATE, MAX_PLY
+
+ENGINE_NAME = 'Chess'
+ENGINE_AUTHOR = 'Mizim7'
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1'
+
+DEFAULT_HASH = 16  # Мегабайты
+MAX_HASH = 1024
+TT_ENTRY_BYTES = 200  # Примерный размер записи хеш-таблицы в словаре Python
+DEFAULT_CLOCK = 60.0  # Секунды на часах, если для стороны на ходу не задано никаких ограничений
+
+
+class UciEngine:
+    """Разбор команд UCI и запуск перебора в отдельном потоке."""
+
+    def __init__(self, output=None):
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        self.position = Position.initial()
+        self.search = Search(self.position, self._tt_size(DEFAULT_HASH))
+        self.thread = None  # Поток текущего перебора
+        self.stop_requested = threading.Event()  # Команда stop для бесконечного анализа
+
+    @staticmethod
+    def _tt_size(megabytes):
+        return megabytes * 1024 * 1024 // TT_ENTRY_BYTES
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def loop(self, stream=None):
+        """Читает команды до 'quit' или конца ввода."""
+        for line in stream or sys.stdin:
+            if not self.handle(line):
+                break
+        self.stop()
+
+    def handle(self, line):
+        """Выполняет одну команду. Возвращает False для 'quit'.
+
+        Некорректная команда (нечисловой параметр, неверный FEN) игнорируется,
+        чтобы ошибка во входных данных не завершала процесс движка.
+        """
+        try:
+            return self._handle(line)
+        except (ValueError, KeyError, IndexError) as error:
+            self.send(f"info string команда проигнорирована: {line.strip()} ({error!r})")
+            return True
+
+    def _handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH} min 1 max {MAX_HASH}")
+            # Перебор однопоточный: интерпретатор Python не выполняет его параллельно
+            self.send("option name Threads type spin default 1 min 1 max 1")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'ucinewgame':
+            self.stop()
+            self.search.clear()
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'position':
+            self.stop()
+            self.set_position(args)
+        elif command == 'go':
+            self.stop()
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            return False
+        return True
+
+    def set_option(self, args):
+        """setoption name <имя> value <значение>"""
+        if 'name' not in args:
+            return
+        value_at = args.index('value') if 'value' in args else len(args)
+        name = ' '.join(args[args.index('name') + 1:value_at]).lower()
+        value = ' '.join(args[value_at + 1:])
+        if name == 'hash' and value.isdigit():
+            self.stop()
+            self.search.tt_size = self._tt_size(min(max(int(value), 1), MAX_HASH))
+            self.search.tt.clear()
+        elif name == 'threads':
+            pass  # Поддерживается только один поток
+
+    def set_position(self, args):
+        """position [startpos | fen <fen>] [moves <ход> ...]"""
+        moves_at = args.index('moves') if 'moves' in args else len(args)
+        if args and args[0] == 'fen':
+            position = Position.from_fen(' '.join(args[1:moves_at]))
+        else:
+            position = Position.from_fen(START_FEN)
+        for text in args[moves_at + 1:]:
+            try:
+                move = parse_move(text)
+            except ValueError:
+                break
+            if not position.is_legal(move):
+                break  # Остальные ходы после недопустимого не применяем
+            position.make_move(move)
+        self.position = position
+        self.search.set_position(position)
+
+    def go(self, args):
+        """go [wtime] [btime] [winc] [binc] [movestogo] [movetime] [depth] [nodes] [infinite]"""
+        params = {}
+        for name, value in zip(args, args[1:]):
+            if name in ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'movetime', 'depth', 'nodes'):
+                params[name] = int(value)
+
+        movetime = soft_time = None
+        if 'movetime' in params:
+            movetime = max(params['movetime'] / 1000, timeman.MIN_TIME)  # Не меньше минимального времени
+        elif 'infinite' not in args:
+            clock, increment = ('wtime', 'winc') if self.position.side == WHITE else ('btime', 'binc')
+            if clock in params:
+                soft_time, movetime = timeman.allocate(params[clock] / 1000, params.get(increment, 0) / 1000,
+                                                       params.get('movestogo'))
+            elif 'depth' not in params and 'nodes' not in params:
+                soft_time, movetime = timeman.allocate(DEFAULT_CLOCK)  # Иначе перебор ничем не ограничен
+
+        self.search.stopped = False
+        self.stop_requested.clear()
+        self.thread = threading.Thread(
+            target=self._search,
+            args=(params.get('depth', MAX_PLY), movetime, params.get('nodes'), soft_time, 'infinite' in args),
+            daemon=True)
+        self.thread.start()
+
+    def _search(self, depth, movetime, nodes, soft_time, infinite):
+        started = time.perf_counter()
+
+        def report(depth, score, nodes, pv):
+            elapsed = max(time.perf_counter() - started, 1e-6)
+            if score >= MATE - MAX_PLY:
+                score_text = f"mate {(MATE - score + 1) // 2}"
+            elif score <= -MATE + MAX_PLY:
+                score_text = f"mate -{(MATE + score + 1) // 2}"
+            else:
+                score_text = f"cp {score}"
+            self.send(f"info depth {depth} score {score_text} nodes {nodes} nps {int(nodes / elapsed)} "
+                      f"time {int(elapsed * 1000)} pv {' '.join(move_name(move) for move in pv)}")
+
+        best, _ = self.search.iterate(depth, movetime, nodes, report, soft_time)
+        if infinite:
+            self.stop_requested.wait()  # По протоколу bestmove при go infinite отправляется только после stop
+        self.send(f"bestmove {move_name(best) if best else '0000'}")
+
+    def stop(self):
+        """Прерывает текущий перебор и дожидается ответа bestmove."""
+        if self.thread:
+            self.stop_requested.set()
+            self.search.stop()
+            self.thread.join()
+            self.thread = None
+
+
+if __name__ == '__main__':
+    UciEngine().loop()